@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, Hashable, Optional
+
+from app.domain.models import FoodProvider, Permit, Coordinate, haversine_distance
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_epoch_micros(value: Optional[datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_epoch_micros(value: Optional[int], tz: Optional[tzinfo]) -> Optional[datetime]:
+    if value is None:
+        return None
+    result = _EPOCH + timedelta(microseconds=value)
+    # Restore the original flavour: naive upstream dates stay naive, aware ones keep their timezone
+    return result.replace(tzinfo=None) if tz is None else result.astimezone(tz)
+
+
+def _tz_of(value: Optional[datetime]) -> Optional[tzinfo]:
+    return None if value is None else value.tzinfo
+
+
+def micros_to_seconds(value: Optional[int]) -> Optional[int]:
+    # Truncates like to_epoch_seconds so indexes over records and models agree
+    return None if value is None else int(value / 1_000_000)
+
+
+class ProviderRecord:
+    """
+    Compact, slotted storage form of a FoodProvider. The permit and coordinate are stored inline, and dates are held
+    as epoch microseconds, so each provider costs a single object instead of a tree of Pydantic models and datetimes.
+
+    Records expose the same attributes as the FoodProvider model so specifications work on them unchanged: the
+    permit and coord attributes return the record itself, which carries the Permit and Coordinate attribute names.
+    Pydantic models are only produced (via to_model) for the providers that are actually returned by a query.
+    """
+
+    __slots__ = ("location_id", "name", "food_items", "location_description", "blocklot", "block", "lot", "cnn",
+                 "address", "permitStatus", "permitID", "approval", "received", "expiration", "approval_tz",
+                 "received_tz", "expiration_tz", "latitude", "longitude")
+
+    @classmethod
+    def from_model(cls, provider: FoodProvider, pool: Dict[Hashable, Hashable]) -> "ProviderRecord":
+        """
+        Build a record from a provider model. Equal values (applicant names, addresses, food item lists, block/lot
+        values, dates...) are deduplicated through the given pool so each distinct value is stored once per snapshot.
+        Unlike sys.intern, the pool is dropped together with its snapshot.
+        """
+        setdefault = pool.setdefault
+
+        def intern(value):
+            return setdefault(value, value)
+
+        permit = provider.permit
+        record = cls()
+        record.location_id = str(provider.location_id)
+        record.name = intern(provider.name)
+        record.food_items = intern(provider.food_items)
+        record.location_description = intern(provider.location_description)
+        record.blocklot = intern(provider.blocklot)
+        record.block = intern(provider.block)
+        record.lot = intern(provider.lot)
+        record.cnn = intern(provider.cnn)
+        record.address = intern(provider.address)
+        record.permitStatus = permit.permitStatus
+        record.permitID = intern(permit.permitID)
+        record.approval = intern(_to_epoch_micros(permit.approvalDate))
+        record.received = intern(_to_epoch_micros(permit.recievedDate))
+        record.expiration = intern(_to_epoch_micros(permit.expirationDate))
+        # Awareness is kept per date: upstream rows can mix naive ISO dates with aware epoch fallbacks
+        record.approval_tz = _tz_of(permit.approvalDate)
+        record.received_tz = _tz_of(permit.recievedDate)
+        record.expiration_tz = _tz_of(permit.expirationDate)
+        record.latitude = provider.coord.latitude
+        record.longitude = provider.coord.longitude
+        return record
+
+    @property
+    def permit(self) -> "ProviderRecord":
+        return self
+
+    @property
+    def coord(self) -> "ProviderRecord":
+        return self
+
+    @property
+    def approvalDate(self) -> Optional[datetime]:
+        return _from_epoch_micros(self.approval, self.approval_tz)
+
+    @property
+    def recievedDate(self) -> Optional[datetime]:
+        return _from_epoch_micros(self.received, self.received_tz)
+
+    @property
+    def expirationDate(self) -> Optional[datetime]:
+        return _from_epoch_micros(self.expiration, self.expiration_tz)
+
+    def distance_to(self, other) -> float:
+        return haversine_distance(other.latitude, other.longitude, self.latitude, self.longitude)
+
+    def to_model(self) -> FoodProvider:
+        return FoodProvider.model_construct(
+            location_id=self.location_id,
+            name=self.name,
+            food_items=self.food_items,
+            permit=Permit.model_construct(
+                permitStatus=self.permitStatus,
+                permitID=self.permitID,
+                approvalDate=self.approvalDate,
+                recievedDate=self.recievedDate,
+                expirationDate=self.expirationDate,
+            ),
+            coord=Coordinate.model_construct(latitude=self.latitude, longitude=self.longitude),
+            location_description=self.location_description,
+            blocklot=self.blocklot,
+            block=self.block,
+            lot=self.lot,
+            cnn=self.cnn,
+            address=self.address,
+        )
@@ -1,10 +1,150 @@
 from __future__ import annotations
 
-from typing import List, Dict
+import gc
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import List, Iterable, Tuple
 
+from app.adapters.compact import ProviderRecord, micros_to_seconds
+from app.domain.indexes import FoodProviderIndexes
 from app.domain.models import FoodProvider
-from app.domain.ports import FoodProviderRepository
+from app.domain.ports import FoodProviderRepository, FoodProviderSnapshot, FoodProviderRepositoryBuilder
 from app.domain.specification import Specification
+from app.domain.statistics import FoodProviderStatistics
+
+# Relative cost of materializing and serializing one result, in the same units as Specification.cost
+RESULT_COST = 200.0
+
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+@contextmanager
+def _collection_paused():
+    """
+    Pause the cyclic garbage collector while snapshot contents are being built. A full collection walks every
+    tracked object while holding the GIL, so collections triggered by the hundreds of thousands of allocations of a
+    rebuild stall readers on the event loop even though the rebuild itself runs in a worker thread. Everything
+    allocated in the meantime is frozen afterwards, so later collections do not walk the new snapshot either; its
+    records are acyclic and are still freed by reference counting once a newer generation replaces them.
+    """
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0:
+                gc.freeze()
+                if _gc_was_enabled:
+                    gc.enable()
+
+
+class InMemoryFoodProviderSnapshot(FoodProviderSnapshot):
+    """
+    A single immutable generation of the in-memory store. Everything derived from the providers (statistics and
+    secondary indexes) is built together with the snapshot so that a reader holding a snapshot always sees a
+    consistent view, regardless of how many generations have been installed since.
+
+    Providers are stored as compact ProviderRecords with deduplicated strings; FoodProvider models are only created
+    for the results handed out by get_all and get_by_spec.
+    """
+
+    def __init__(self, generation: int, records: Tuple[ProviderRecord, ...], stats: FoodProviderStatistics,
+                 indexes: FoodProviderIndexes):
+        self._generation = generation
+        self._records = records
+        self._stats = stats
+        self._indexes = indexes
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get_all(self) -> List[FoodProvider]:
+        return [r.to_model() for r in self._records]
+
+    def get_statistics(self) -> FoodProviderStatistics:
+        return self._stats
+
+    def get_indexes(self) -> FoodProviderIndexes:
+        return self._indexes
+
+    def estimate_cost(self, spec: Specification[FoodProvider]) -> float:
+        # Runs on the event loop before admission control, so it only uses statistics and index bounds and never
+        # builds candidate sets
+        plan = spec.optimize(self._stats)
+        estimate = plan.estimate_candidates(self._indexes)
+        candidates = len(self._records) if estimate is None else min(estimate, len(self._records))
+        results = candidates * plan.selectivity(self._stats)
+        limit = spec.result_limit()
+        if limit is not None:
+            results = min(results, limit)
+        return candidates * plan.cost(self._stats) + results * RESULT_COST
+
+    def get_by_spec(self, spec: Specification[FoodProvider]) -> List[FoodProvider]:
+        # Filter with the cost-optimized plan, results are identical to filtering with the spec itself
+        plan = spec.optimize(self._stats)
+        positions = plan.candidates(self._indexes)
+        if positions is None:
+            candidates = self._records
+        else:
+            # Keep store order so indexed and unindexed evaluation return identical results
+            candidates = [self._records[i] for i in sorted(positions)]
+        filtered = plan.filter(candidates)
+        # Allow specification to influence ordering
+        return [r.to_model() for r in spec.order(filtered)]
+
+
+class InMemoryFoodProviderRepositoryBuilder(FoodProviderRepositoryBuilder):
+    """
+    Builds the next snapshot one batch at a time. Each provider is converted to a compact record as soon as it is
+    added, so the models of a batch can be released before the next batch arrives. Statistics and indexes are
+    derived from the records once everything has been added.
+    """
+
+    def __init__(self, repository: "InMemoryFoodProviderRepository"):
+        self._repository = repository
+        self._pool = {}
+        self._records: dict[str, ProviderRecord] = {}
+
+    def add(self, providers: Iterable[FoodProvider]):
+        with _collection_paused():
+            for p in providers:
+                if p is None:
+                    continue
+                key = None
+                if hasattr(p, 'location_id'):
+                    key = getattr(p, 'location_id')
+                if key:
+                    self._records[str(key)] = ProviderRecord.from_model(p, self._pool)
+
+    def build(self) -> InMemoryFoodProviderSnapshot:
+        with _collection_paused():
+            records = tuple(self._records.values())
+            indexes = FoodProviderIndexes.build(
+                records,
+                expiration=lambda r: micros_to_seconds(r.expiration),
+                approval=lambda r: micros_to_seconds(r.approval),
+                received=lambda r: micros_to_seconds(r.received),
+            )
+            return InMemoryFoodProviderSnapshot(self._repository.next_generation(), records,
+                                                FoodProviderStatistics.from_providers(records), indexes)
+
+    def commit(self) -> int:
+        snapshot = self.build()
+        self._repository.install(snapshot)
+        return len(snapshot)
 
 
 class InMemoryFoodProviderRepository(FoodProviderRepository):
@@ -12,27 +152,42 @@ class InMemoryFoodProviderRepository(FoodProviderRepository):
     In-memory implementation of the FoodProviderRepository port. For the sake of simplicity, this is currently just
     a list of FoodProvider objects. This is technically not a reliable way to store data if we are intending on
     implementing multiple clients and should be replaced by a more robust data store in the future.
+
+    The contents are held in an immutable snapshot. replace_all builds a complete new snapshot before publishing it
+    with a single reference assignment, so it is safe to call from a worker thread while requests are being served.
     """
 
     def __init__(self):
-        self._store: Dict[str, FoodProvider] = {}
+        self._generations = itertools.count(1)
+        self._snapshot = InMemoryFoodProviderSnapshot(0, (), FoodProviderStatistics(), FoodProviderIndexes.empty())
+
+    def next_generation(self) -> int:
+        return next(self._generations)
+
+    def builder(self) -> InMemoryFoodProviderRepositoryBuilder:
+        return InMemoryFoodProviderRepositoryBuilder(self)
+
+    def build_snapshot(self, providers: Iterable[FoodProvider]) -> InMemoryFoodProviderSnapshot:
+        builder = self.builder()
+        # Only compact records are kept, so models from a lazy iterable can be released right away
+        builder.add(providers)
+        return builder.build()
+
+    def install(self, snapshot: InMemoryFoodProviderSnapshot):
+        # Single reference swap; readers that already hold the previous snapshot keep using it
+        self._snapshot = snapshot
 
     def replace_all(self, providers: List[FoodProvider]):
-        new_store: dict[str, FoodProvider] = {}
-        for p in providers:
-            if p is None:
-                continue
-            key = None
-            if hasattr(p, 'location_id'):
-                key = getattr(p, 'location_id')
-            if key:
-                new_store[str(key)] = p
-        self._store = new_store
+        self.install(self.build_snapshot(providers))
+
+    def snapshot(self) -> InMemoryFoodProviderSnapshot:
+        return self._snapshot
 
     def get_all(self) -> List[FoodProvider]:
-        return list(self._store.values())
+        return self._snapshot.get_all()
+
+    def get_statistics(self) -> FoodProviderStatistics:
+        return self._snapshot.get_statistics()
 
     def get_by_spec(self, spec: Specification[FoodProvider]) -> List[FoodProvider]:
-        filtered = spec.filter(self.get_all())
-        # Allow specification to influence ordering
-        return spec.order(filtered)
+        return self._snapshot.get_by_spec(spec)
@@ -1,41 +1,68 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import List, Optional
-
-from sodapy import Socrata
+from typing import AsyncIterator, List, Optional, TYPE_CHECKING
 
+from app.domain.cadence import UpdateCadence
 from app.domain.models import FoodProvider, Permit, PermitStatus, Coordinate
 from app.domain.ports import FoodProviderDataClient
 
 DATASET_ID = "rqzj-sfat"  # Mobile Food Facility Permits (SF Gov)
 DOMAIN = "data.sfgov.org"
+PAGE_SIZE = 2000
 
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    from sodapy import Socrata
+
 
 class SFGovFoodProviderDataClient(FoodProviderDataClient):
     """SFGov implementation of FoodProviderClient using the Socrata API."""
 
-    def __init__(self, app_token: Optional[str] = None):
-        self.client = Socrata(DOMAIN, app_token, timeout=30)
+    def __init__(self, app_token: Optional[str] = None, domain: str = DOMAIN, secure: bool = True):
+        self._app_token = app_token
+        # Allows pointing the client at a local stand-in (e.g. benchmarks/fake_socrata.py) over plain HTTP
+        self._domain = domain
+        self._secure = secure
+        self._client: Optional["Socrata"] = None
+        # rowsUpdatedAt history, used to poll often around expected updates and rarely otherwise
+        self._cadence = UpdateCadence()
+
+    @property
+    def client(self) -> "Socrata":
+        # sodapy (and requests underneath it) is only imported once the first upstream call is made, which keeps it
+        # out of the application's import time
+        if self._client is None:
+            from sodapy import Socrata
+            session_adapter = None
+            if not self._secure:
+                from requests.adapters import HTTPAdapter
+                session_adapter = {"prefix": "http://", "adapter": HTTPAdapter()}
+            self._client = Socrata(self._domain, self._app_token, session_adapter=session_adapter, timeout=30)
+        return self._client
 
     async def fetch_all(self) -> List[dict]:
         logger.info("Fetching SFGovFoodProviderClient data")
         results: List[dict] = []
+        async for chunk in self.stream_pages():
+            results.extend(chunk)
+        logger.info(f"Fetched {len(results)} rows from SFGovFoodProviderClient")
+        return results
+
+    async def stream_pages(self) -> AsyncIterator[List[dict]]:
         offset = 0
-        batch_size = 2000
         while True:
-            chunk = self.client.get(DATASET_ID, limit=batch_size, offset=offset)
+            # sodapy is blocking, run each page request in a worker thread so the event loop keeps serving
+            chunk = await asyncio.to_thread(self.client.get, DATASET_ID, limit=PAGE_SIZE, offset=offset)
             if not chunk:
                 break
-            results.extend(chunk)
-            if len(chunk) < batch_size:
+            yield chunk
+            if len(chunk) < PAGE_SIZE:
                 break
-            offset += batch_size
-        logger.info(f"Fetched {len(results)} rows from SFGovFoodProviderClient")
-        return results
+            offset += PAGE_SIZE
 
     def map_results(self, results: List[dict]) -> List[FoodProvider]:
         providers: List[FoodProvider] = []
@@ -54,12 +81,14 @@ class SFGovFoodProviderDataClient(FoodProviderDataClient):
         meta = self.client.get_metadata(DATASET_ID)
         ts = meta.get("rowsUpdatedAt") or meta.get("rowsUpdatedAt")
         try:
-            return datetime.fromtimestamp(int(ts), tz=timezone.utc)
+            updated_at = datetime.fromtimestamp(int(ts), tz=timezone.utc)
         except Exception:
             raise Exception(f"Unable to parse Socrata rowsUpdatedAt: {ts}")
+        self._cadence.observe(updated_at)
+        return updated_at
 
     def get_interval(self) -> int:
-        return 3600
+        return self._cadence.next_interval(datetime.now(timezone.utc))
 
 
 def _parse_dt(value: Optional[str]) -> Optional[datetime]:
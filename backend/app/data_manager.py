@@ -2,69 +2,185 @@ from __future__ import annotations
 
 import asyncio
 import logging
+from contextlib import aclosing
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, TypeVar
 
-from app.domain.ports import FoodProviderDataClient, FoodProviderRepository
+from app.domain.ports import FoodProviderDataClient, FoodProviderRepository, FoodProviderSnapshot
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Pages fetched ahead while the current page is being mapped. The bounded queue is the backpressure: the fetcher
+# blocks once it is this far ahead of the mapper.
+PREFETCH_PAGES = 1
+
+# Seconds a refresh request waits for further requests before fetching, so a burst of triggers causes one fetch
+REFRESH_DEBOUNCE = 2.0
+
+_DONE = object()
+
+
+async def _prefetch(pages: AsyncIterator[T], depth: int) -> AsyncIterator[T]:
+    """
+    Iterate an async iterator while fetching up to depth items ahead of the consumer. The source is closed when
+    iteration ends, fails or is abandoned, so e.g. a paging generator releases its state right away.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=depth)
+
+    async def produce():
+        try:
+            async for page in pages:
+                await queue.put(page)
+            await queue.put(_DONE)
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        aclose = getattr(pages, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
 
 class DataManager:
     """
     Manages periodic polling of upstream data sources (data clients).
+    - Sleeps for the shortest interval requested by any client, or until refresh() is called
     - Checks source metadata (last updated timestamp)
     - If new data is available, fetches and maps it
     - Updates the repository
+    - Notifies update listeners with the newly published snapshot
     """
 
-    def __init__(self, repository: FoodProviderRepository, clients: List[FoodProviderDataClient]):
+    def __init__(self, repository: FoodProviderRepository, clients: List[FoodProviderDataClient],
+                 refresh_debounce: float = REFRESH_DEBOUNCE):
         self._repository = repository
         self._clients = clients
         self._last_updates: Dict[FoodProviderDataClient, Optional[datetime]] = {c: None for c in clients}
         self._task: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
+        self._wake_event = asyncio.Event()
+        self._refresh_requested = False
+        self._refresh_debounce = refresh_debounce
+        self._listeners: List[Callable[[FoodProviderSnapshot], None]] = []
+        # Listener runs still in progress; referenced here so they are not garbage collected while running
+        self._listener_tasks: Set[asyncio.Task] = set()
+
+    def add_listener(self, listener: Callable[[FoodProviderSnapshot], None]):
+        """
+        Register a callable invoked with the new snapshot after every successful update, e.g. to precompute derived
+        data once per generation. Listeners run in a worker thread in the background, so a slow listener does not
+        hold up the update or the next poll, and their failures are logged, not raised.
+        """
+        self._listeners.append(listener)
+
+    def refresh(self):
+        """
+        Ask for an immediate re-fetch from every client, regardless of their metadata. Triggers are debounced: all
+        requests arriving within refresh_debounce seconds of each other, or while a refresh is still waiting to run,
+        result in a single fetch.
+        """
+        self._refresh_requested = True
+        self._wake_event.set()
 
     async def _run_loop(self):
         try:
             while not self._stop_event.is_set():
-                min_interval = None
+                force = False
+                if self._refresh_requested:
+                    # Let a burst of triggers settle, then serve all of them with one fetch
+                    await asyncio.sleep(self._refresh_debounce)
+                    self._refresh_requested = False
+                    force = True
+                    logger.info("Refresh requested, fetching from all clients")
+
                 for client in self._clients:
-                    try:
-                        interval = max(1, int(client.get_interval()))
-                    except Exception:
-                        interval = 3600
-                    min_interval = interval if min_interval is None else min(min_interval, interval)
-
-                    try:
-                        source_updated_at = client.get_source_updated_at()
-                    except Exception as e:
-                        logger.warning(f"Failed to read metadata for {client.__class__.__name__}: {e}")
-                        continue
-
-                    last_seen = self._last_updates.get(client)
-                    if last_seen is None or last_seen != source_updated_at:
-                        logger.info(f"Change detected for {client.__class__.__name__}. Fetching new data...")
-                        try:
-                            rows = await client.fetch_all()
-                            providers = client.map_results(rows)
-                            self._repository.replace_all(providers)
-                            self._last_updates[client] = source_updated_at
-                            logger.info(
-                                f"Updated repository with {len(providers)} providers from {client.__class__.__name__}")
-                        except Exception as e:
-                            logger.exception(f"Failed to update from {client.__class__.__name__}: {e}")
-                # Sleep for the minimum interval among clients
-                await asyncio.wait_for(self._stop_event.wait(), timeout=min_interval or 3600)
-        except asyncio.TimeoutError:
-            # Normal wake-up to continue loop
-            if not self._stop_event.is_set():
-                await self._run_loop()
+                    await self._poll(client, force)
+
+                # Sleep until the earliest client wants to be polled again, or until woken by refresh() or stop()
+                self._wake_event.clear()
+                if self._refresh_requested or self._stop_event.is_set():
+                    continue
+                try:
+                    await asyncio.wait_for(self._wake_event.wait(), timeout=self._next_interval())
+                except asyncio.TimeoutError:
+                    pass
         except asyncio.CancelledError:
             pass
         finally:
             self._task = None
 
+    def _next_interval(self) -> int:
+        intervals = []
+        for client in self._clients:
+            try:
+                intervals.append(max(1, int(client.get_interval())))
+            except Exception:
+                intervals.append(3600)
+        return min(intervals, default=3600)
+
+    async def _poll(self, client: FoodProviderDataClient, force: bool = False):
+        try:
+            # Metadata requests are blocking network calls, keep them off the event loop
+            source_updated_at = await asyncio.to_thread(client.get_source_updated_at)
+        except Exception as e:
+            logger.warning(f"Failed to read metadata for {client.__class__.__name__}: {e}")
+            if not force:
+                return
+            source_updated_at = None
+
+        last_seen = self._last_updates.get(client)
+        if force or last_seen is None or last_seen != source_updated_at:
+            logger.info(f"Change detected for {client.__class__.__name__}. Fetching new data...")
+            try:
+                count = await self._ingest(client)
+                if source_updated_at is not None:
+                    self._last_updates[client] = source_updated_at
+                logger.info(f"Updated repository with {count} providers from {client.__class__.__name__}")
+            except Exception as e:
+                logger.exception(f"Failed to update from {client.__class__.__name__}: {e}")
+
+    async def _ingest(self, client: FoodProviderDataClient) -> int:
+        """
+        Streams pages from the client through mapping into a repository builder. Peak memory is roughly the pages in
+        flight plus the new store, instead of the full raw result set, its mapped models and the new store at once.
+        Nothing is published unless every page was ingested successfully.
+        """
+        builder = self._repository.builder()
+        async with aclosing(_prefetch(client.stream_pages(), PREFETCH_PAGES)) as pages:
+            async for rows in pages:
+                # Mapping and building are CPU bound, keep them off the event loop so requests are served from the
+                # current snapshot in the meantime
+                providers = await asyncio.to_thread(client.map_results, rows)
+                await asyncio.to_thread(builder.add, providers)
+        count = await asyncio.to_thread(builder.commit)
+        self._notify(self._repository.snapshot())
+        return count
+
+    def _notify(self, snapshot: FoodProviderSnapshot):
+        for listener in self._listeners:
+            task = asyncio.create_task(self._run_listener(listener, snapshot))
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._listener_tasks.discard)
+
+    async def _run_listener(self, listener: Callable[[FoodProviderSnapshot], None], snapshot: FoodProviderSnapshot):
+        try:
+            await asyncio.to_thread(listener, snapshot)
+        except Exception as e:
+            logger.exception(f"Update listener {listener!r} failed: {e}")
+
     def start(self):
         if self._task is not None and not self._task.done():
             return
@@ -72,9 +188,13 @@ class DataManager:
         self._task = asyncio.create_task(self._run_loop())
 
     async def stop(self):
+        for task in list(self._listener_tasks):
+            task.cancel()
+        await asyncio.gather(*self._listener_tasks, return_exceptions=True)
         if self._task is None:
             return
         self._stop_event.set()
+        self._wake_event.set()
         self._task.cancel()
         try:
             await self._task
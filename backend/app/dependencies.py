@@ -1,6 +1,7 @@
 from app.adapters.memory import InMemoryFoodProviderRepository
 from app.adapters.sfgov_data_client import SFGovFoodProviderDataClient
 from app.data_manager import DataManager
+from app.routers.execution import QueryExecutor
 
 repository = InMemoryFoodProviderRepository()
 
@@ -11,6 +12,9 @@ data_clients = [sfgov_datasource]
 
 data_manager = DataManager(repository, data_clients)
 
+# Runs expensive queries off the event loop with bounded concurrency
+query_executor = QueryExecutor()
+
 
 async def initialize():
     # Start background data manager loop
@@ -19,7 +23,10 @@ async def initialize():
 
 async def shutdown():
     await data_manager.stop()
+    query_executor.shutdown()
 
 
-def get_repository():
+# Async so FastAPI resolves it on the event loop: a sync dependency costs every request a trip through the thread pool,
+# which also staggers identical concurrent requests so that they no longer meet in the same query flight
+async def get_repository():
     return repository
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import math
+import statistics
+from collections import deque
+from datetime import datetime
+from typing import Deque, Optional
+
+# Shortest wait between metadata checks
+MIN_INTERVAL = 60
+# Used until at least two updates have been observed and a cadence can be estimated, and the longest wait between
+# checks inside the window around an expected update; the previous fixed interval
+DEFAULT_INTERVAL = 3600
+# Number of upstream update timestamps kept to estimate the cadence
+HISTORY_SIZE = 16
+# Half-width of the window around an expected update, as a fraction of the cadence
+WINDOW_FRACTION = 0.1
+# Number of checks spread evenly over the window around an expected update
+WINDOW_CHECKS = 8
+
+
+class UpdateCadence:
+    """
+    Learns how often an upstream data source publishes updates from the history of its last-updated timestamps, and
+    suggests how long to wait before the next metadata check: several times around the time the next update is
+    expected, and not at all in between. Once the cadence is known, a daily data set costs about ten checks a day
+    instead of 24, and an on-schedule update is noticed at least as quickly as with hourly polling. An update published
+    off schedule is only noticed in the next window; the refresh endpoint is the way to pick it up sooner.
+
+    The cadence is the median gap between consecutive observed updates, which ignores the odd skipped or extra update.
+    Once an expected update is overdue, polling stays frequent for the length of the window and then assumes the
+    upstream skipped that update and waits for the following one.
+    """
+
+    def __init__(self, history_size: int = HISTORY_SIZE, min_interval: int = MIN_INTERVAL,
+                 default_interval: int = DEFAULT_INTERVAL):
+        self._updates: Deque[float] = deque(maxlen=history_size)
+        self.min_interval = min_interval
+        self.default_interval = default_interval
+
+    def observe(self, updated_at: datetime):
+        """Record the source's last-updated timestamp. Repeated observations of the same update are ignored."""
+        value = updated_at.timestamp()
+        if self._updates and value <= self._updates[-1]:
+            return
+        self._updates.append(value)
+
+    @property
+    def cadence(self) -> Optional[float]:
+        """Estimated seconds between upstream updates, or None until two updates have been observed."""
+        if len(self._updates) < 2:
+            return None
+        updates = list(self._updates)
+        return statistics.median(b - a for a, b in zip(updates, updates[1:]))
+
+    def _window(self, cadence: float) -> float:
+        return max(self.min_interval, cadence * WINDOW_FRACTION)
+
+    @property
+    def max_interval(self) -> float:
+        """
+        Longest wait between checks: from just after an update until the window around the next one opens, or the
+        default interval while the cadence is unknown.
+        """
+        cadence = self.cadence
+        if cadence is None:
+            return self.default_interval
+        return max(self.default_interval, cadence - self._window(cadence))
+
+    def next_interval(self, now: datetime) -> int:
+        cadence = self.cadence
+        if cadence is None:
+            return self.default_interval
+
+        window = self._window(cadence)
+        expected = self._updates[-1] + cadence
+        current = now.timestamp()
+        # Skip expected updates whose window has passed without an update being observed
+        if current > expected + window:
+            expected += math.ceil((current - expected - window) / cadence) * cadence
+
+        if current >= expected - window:
+            # Inside the window: spread the checks over it, but never wait longer than fixed polling did
+            interval = min(self.default_interval, 2 * window / WINDOW_CHECKS)
+        else:
+            # Outside the window: wait until it opens
+            interval = expected - window - current
+        return int(max(self.min_interval, interval))
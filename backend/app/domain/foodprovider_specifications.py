@@ -1,7 +1,24 @@
-from typing import List
+from abc import abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
-from app.domain.models import FoodProvider, PermitStatus, Coordinate
-from app.domain.specification import Specification
+from app.domain.geo import BoundingBox, EquirectangularProjection, bounding_box, expand_bbox, point_segment_distance
+from app.domain.indexes import FoodProviderIndexes, SortedIndex
+from app.domain.models import FoodProvider, PermitStatus, Coordinate, to_epoch_seconds
+from app.domain.specification import Specification, DEFAULT_SELECTIVITY
+from app.domain.statistics import FoodProviderStatistics, substring_fraction
+
+# Relative per-candidate costs used for ordering composite specifications. Attribute comparisons are the baseline,
+# substring searches additionally pay for lower-casing and scanning the field.
+ATTRIBUTE_COST = 1.0
+SUBSTRING_BASE_COST = 2.0
+SUBSTRING_COST_PER_CHAR = 0.1
+# A projected point to segment distance, paid for every route segment whose buffered box holds a provider
+SEGMENT_COST = 0.5
+# Exact great-circle distance, only computed for providers inside the bounding box
+HAVERSINE_COST = 3.0
+# Geographic areas such as route corridors usually cover only a small part of the data set
+GEO_SELECTIVITY = 0.05
 
 
 class HasPermitStatus(Specification[FoodProvider]):
@@ -14,6 +31,14 @@ class HasPermitStatus(Specification[FoodProvider]):
                 and provider.permit.permitStatus == self.status
         )
 
+    def cost(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        return ATTRIBUTE_COST
+
+    def selectivity(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        if stats is None:
+            return DEFAULT_SELECTIVITY
+        return stats.status_fraction(self.status)
+
 
 class LikeName(Specification[FoodProvider]):
     def __init__(self, name: str):
@@ -22,29 +47,329 @@ class LikeName(Specification[FoodProvider]):
     def is_satisfied_by(self, provider: FoodProvider) -> bool:
         return self.name.lower() in provider.name.lower()
 
+    def cost(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        avg_length = stats.avg_name_length if stats is not None else 0.0
+        return SUBSTRING_BASE_COST + SUBSTRING_COST_PER_CHAR * avg_length
+
+    def selectivity(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        if stats is None:
+            return DEFAULT_SELECTIVITY
+        return substring_fraction(self.name, stats.name_sample)
+
 
 class LikeStreetName(Specification[FoodProvider]):
     def __init__(self, streetName: str):
         self.streetName = streetName
 
     def is_satisfied_by(self, provider: FoodProvider) -> bool:
-        return self.streetName.lower() in provider.address.lower()
+        return provider.address is not None and self.streetName.lower() in provider.address.lower()
+
+    def cost(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        avg_length = stats.avg_address_length if stats is not None else 0.0
+        return SUBSTRING_BASE_COST + SUBSTRING_COST_PER_CHAR * avg_length
+
+    def selectivity(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        if stats is None:
+            return DEFAULT_SELECTIVITY
+        return substring_fraction(self.streetName, stats.address_sample)
+
+
+def _has_location(provider: FoodProvider) -> bool:
+    # 0.0 / 0.0 is how upstream marks an unknown location
+    return provider.coord is not None and (provider.coord.latitude != 0.0 and provider.coord.longitude != 0.0)
+
+
+class _DistanceCache:
+    """Great-circle distances from a reference point in km, computed at most once per provider."""
+
+    def __init__(self, point: Coordinate):
+        self._point = point
+        self._distances: Dict[str, float] = {}
+
+    def get(self, provider: FoodProvider) -> float:
+        key = provider.location_id
+        distance = self._distances.get(key)
+        if distance is None:
+            distance = provider.coord.distance_to(self._point)
+            self._distances[key] = distance
+        return distance
 
 
 class ClosestToPointSpecification(Specification[FoodProvider]):
     def __init__(self, point: Coordinate, limit: int = 5):
         self.reference_point: Coordinate = point
         self.limit = limit
+        self._distances = _DistanceCache(point)
 
     def is_satisfied_by(self, provider: FoodProvider) -> bool:
-        return provider.coord is not None and (provider.coord.latitude != 0.0 and provider.coord.longitude != 0.0)
+        return _has_location(provider)
+
+    def cost(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        return ATTRIBUTE_COST
+
+    def selectivity(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        # Almost every provider has a usable coordinate, so this check rarely rejects anything
+        if stats is None:
+            return 1.0
+        return stats.coord_fraction()
+
+    def distance_km(self, provider: FoodProvider) -> Optional[float]:
+        return self._distances.get(provider) if _has_location(provider) else None
+
+    def annotate(self, provider: FoodProvider) -> Dict[str, Any]:
+        distance = self.distance_km(provider)
+        return {} if distance is None else {"distance_km": distance}
+
+    def result_limit(self) -> Optional[int]:
+        return self.limit
 
     def sort_by_distance(self, providers: List[FoodProvider]) -> List[FoodProvider]:
         def get_distance(provider: FoodProvider):
-            return provider.coord.distance_to(self.reference_point)
+            return self._distances.get(provider)
 
         return sorted(providers, key=get_distance)[: self.limit]
 
     def order(self, items: List[FoodProvider]) -> List[FoodProvider]:
         # Delegate to existing distance-based sorter while enforcing limit
         return self.sort_by_distance(items)
+
+
+class WithinRadius(Specification[FoodProvider]):
+    """
+    Matches providers within radius_km of a point. Candidates come from the location index using the radius' bounding
+    box, and each candidate is checked against the box before the exact haversine distance is computed. Results are
+    ordered nearest first, optionally limited to the nearest limit providers, and annotated with their distance.
+    """
+
+    def __init__(self, point: Coordinate, radius_km: float, limit: Optional[int] = None):
+        self.reference_point = point
+        self.radius_km = radius_km
+        self.limit = limit
+        self._box = bounding_box(point.latitude, point.longitude, radius_km)
+        self._distances = _DistanceCache(point)
+
+    def _in_box(self, provider: FoodProvider) -> bool:
+        min_lat, max_lat, min_lon, max_lon = self._box
+        coord = provider.coord
+        return min_lat <= coord.latitude <= max_lat and min_lon <= coord.longitude <= max_lon
+
+    def is_satisfied_by(self, provider: FoodProvider) -> bool:
+        return _has_location(provider) and self._in_box(provider) and self._distances.get(provider) <= self.radius_km
+
+    def candidates(self, indexes: FoodProviderIndexes) -> Optional[Set[int]]:
+        return set(indexes.location.bbox(*self._box))
+
+    def estimate_candidates(self, indexes: FoodProviderIndexes) -> Optional[float]:
+        return indexes.location.estimate_bbox(*self._box)
+
+    def result_limit(self) -> Optional[int]:
+        return self.limit
+
+    def cost(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        return ATTRIBUTE_COST + HAVERSINE_COST
+
+    def selectivity(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        return GEO_SELECTIVITY
+
+    def distance_km(self, provider: FoodProvider) -> Optional[float]:
+        return self._distances.get(provider) if _has_location(provider) else None
+
+    def annotate(self, provider: FoodProvider) -> Dict[str, Any]:
+        distance = self.distance_km(provider)
+        return {} if distance is None else {"distance_km": distance}
+
+    def order(self, items: List[FoodProvider]) -> List[FoodProvider]:
+        # Nearest first, providers without a location (e.g. under negation) last
+        def get_distance(provider: FoodProvider):
+            distance = self.distance_km(provider)
+            return distance is None, distance or 0.0
+
+        return sorted(items, key=get_distance)[: self.limit]
+
+
+class PermitDateInRange(Specification[FoodProvider]):
+    """
+    Matches providers whose permit date falls within [start, end]. Either bound may be None for an open range.
+    Subclasses pick the permit date and matching index; providers without that date never match.
+    """
+
+    def __init__(self, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        self.start = start
+        self.end = end
+        self._low = to_epoch_seconds(start)
+        self._high = to_epoch_seconds(end)
+
+    @abstractmethod
+    def get_date(self, provider: FoodProvider) -> Optional[datetime]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_index(self, indexes: FoodProviderIndexes) -> SortedIndex:
+        raise NotImplementedError
+
+    def is_satisfied_by(self, provider: FoodProvider) -> bool:
+        value = to_epoch_seconds(self.get_date(provider)) if provider.permit is not None else None
+        if value is None:
+            return False
+        return (self._low is None or value >= self._low) and (self._high is None or value <= self._high)
+
+    def candidates(self, indexes: FoodProviderIndexes) -> Optional[Set[int]]:
+        return set(self.get_index(indexes).range(self._low, self._high))
+
+    def estimate_candidates(self, indexes: FoodProviderIndexes) -> Optional[float]:
+        return self.get_index(indexes).count(self._low, self._high)
+
+    def cost(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        return ATTRIBUTE_COST
+
+
+class ExpiresBetween(PermitDateInRange):
+    def get_date(self, provider: FoodProvider) -> Optional[datetime]:
+        return provider.permit.expirationDate
+
+    def get_index(self, indexes: FoodProviderIndexes) -> SortedIndex:
+        return indexes.expiration
+
+    def order(self, items: List[FoodProvider]) -> List[FoodProvider]:
+        # Soonest expiration first, providers without an expiration date (e.g. under negation) last
+        def get_expiration(provider: FoodProvider):
+            value = to_epoch_seconds(provider.permit.expirationDate)
+            return value is None, value or 0
+
+        return sorted(items, key=get_expiration)
+
+
+class ApprovedSince(PermitDateInRange):
+    def __init__(self, since: datetime):
+        super().__init__(since, None)
+
+    def get_date(self, provider: FoodProvider) -> Optional[datetime]:
+        return provider.permit.approvalDate
+
+    def get_index(self, indexes: FoodProviderIndexes) -> SortedIndex:
+        return indexes.approval
+
+
+class ReceivedSince(PermitDateInRange):
+    def __init__(self, since: datetime):
+        super().__init__(since, None)
+
+    def get_date(self, provider: FoodProvider) -> Optional[datetime]:
+        return provider.permit.recievedDate
+
+    def get_index(self, indexes: FoodProviderIndexes) -> SortedIndex:
+        return indexes.received
+
+
+def _in_box(box: BoundingBox, latitude: float, longitude: float) -> bool:
+    min_lat, max_lat, min_lon, max_lon = box
+    return min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon
+
+
+class _Segment:
+    __slots__ = ("projection", "ax", "ay", "bx", "by", "offset", "length", "box")
+
+    def locate(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        """Distance in km from the point to the segment, and the distance along the route to the closest point."""
+        x, y = self.projection.project(latitude, longitude)
+        distance, t = point_segment_distance(x, y, self.ax, self.ay, self.bx, self.by)
+        return distance, self.offset + t * self.length
+
+
+class WithinCorridor(Specification[FoodProvider]):
+    """
+    Matches providers within buffer_m metres of a route given as a list of coordinates. Candidates come from the
+    location index, one query per segment with the segment's buffered bounding box, and each of them is checked
+    against that segment with a point to segment distance in an equirectangular projection centred on the segment.
+    Results are ordered by their position along the route, i.e. the distance travelled until the route passes closest
+    to them.
+    """
+
+    def __init__(self, path: Sequence[Coordinate], buffer_m: float):
+        if not path:
+            raise ValueError("A route needs at least one coordinate")
+        self.path = list(path)
+        self.buffer_m = buffer_m
+        self._buffer_km = buffer_m / 1000
+        # Location id -> distance along the route in km, or None when outside the corridor
+        self._positions: Dict[str, Optional[float]] = {}
+        # (latitude, longitude) -> (distance to the route, position along it) of the indexed providers in the corridor
+        self._matches: Dict[Tuple[float, float], Tuple[float, float]] = {}
+
+        self._segments: List[_Segment] = []
+        offset = 0.0
+        for a, b in zip(self.path, self.path[1:] or self.path):
+            segment = _Segment()
+            # A projection per segment keeps the scale right on routes that cover a wide range of latitudes
+            segment.projection = EquirectangularProjection((a.latitude + b.latitude) / 2)
+            segment.ax, segment.ay = segment.projection.project(a.latitude, a.longitude)
+            segment.bx, segment.by = segment.projection.project(b.latitude, b.longitude)
+            segment.offset = offset
+            segment.length = ((segment.bx - segment.ax) ** 2 + (segment.by - segment.ay) ** 2) ** 0.5
+            segment.box = expand_bbox(min(a.latitude, b.latitude), max(a.latitude, b.latitude),
+                                      min(a.longitude, b.longitude), max(a.longitude, b.longitude), self._buffer_km)
+            self._segments.append(segment)
+            offset += segment.length
+
+    def _nearest(self, latitude: float, longitude: float, segments: Iterable[_Segment],
+                 best: Optional[Tuple[float, float]] = None) -> Optional[Tuple[float, float]]:
+        # Earlier segments win ties, so indexed and unindexed evaluation agree on the position
+        for segment in segments:
+            distance, position = segment.locate(latitude, longitude)
+            if distance <= self._buffer_km and (best is None or distance < best[0]):
+                best = distance, position
+        return best
+
+    def position_along_route(self, provider: FoodProvider) -> Optional[float]:
+        """Distance in km along the route to the point closest to the provider, or None outside the corridor."""
+        key = provider.location_id
+        if key in self._positions:
+            return self._positions[key]
+
+        position = None
+        if _has_location(provider):
+            latitude, longitude = provider.coord.latitude, provider.coord.longitude
+            match = self._matches.get((latitude, longitude))
+            if match is None:
+                # Not found through the index (e.g. under negation), so check every segment whose box holds the point
+                match = self._nearest(latitude, longitude,
+                                      (s for s in self._segments if _in_box(s.box, latitude, longitude)))
+            if match is not None:
+                position = match[1]
+        self._positions[key] = position
+        return position
+
+    def is_satisfied_by(self, provider: FoodProvider) -> bool:
+        return self.position_along_route(provider) is not None
+
+    def candidates(self, indexes: FoodProviderIndexes) -> Optional[Set[int]]:
+        # Each provider is only compared with the segments whose buffered box holds it. The exact checks happen here,
+        # so only providers within the corridor are returned and filtering them is a lookup.
+        positions = set()
+        matches = self._matches
+        for segment in self._segments:
+            for latitude, longitude, p in indexes.location.bbox_entries(*segment.box):
+                key = (latitude, longitude)
+                match = self._nearest(latitude, longitude, (segment,), matches.get(key))
+                if match is not None:
+                    matches[key] = match
+                    positions.add(p)
+        return positions
+
+    def estimate_candidates(self, indexes: FoodProviderIndexes) -> Optional[float]:
+        # Providers are counted once per segment box that holds them, as each of those costs a distance check
+        return sum(indexes.location.estimate_bbox(*s.box) for s in self._segments)
+
+    def cost(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        return ATTRIBUTE_COST + SEGMENT_COST
+
+    def selectivity(self, stats: Optional[FoodProviderStatistics] = None) -> float:
+        return GEO_SELECTIVITY
+
+    def order(self, items: List[FoodProvider]) -> List[FoodProvider]:
+        # Providers outside the corridor (e.g. under negation or a disjunction) go last
+        def get_position(provider: FoodProvider):
+            position = self.position_along_route(provider)
+            return position is None, position or 0.0
+
+        return sorted(items, key=get_position)
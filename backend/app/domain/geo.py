@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from math import cos, radians, sqrt
+from typing import List, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+# Length of one degree of latitude (and of longitude at the equator) on the haversine sphere
+KM_PER_DEGREE = radians(1) * EARTH_RADIUS_KM
+
+BoundingBox = Tuple[float, float, float, float]  # min_lat, max_lat, min_lon, max_lon
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """
+    Decode a polyline in the Google encoded polyline format into (latitude, longitude) pairs. Raises ValueError for
+    malformed input.
+    """
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                if index >= length:
+                    raise ValueError("Truncated polyline")
+                byte = ord(encoded[index]) - 63
+                index += 1
+                if byte < 0 or byte > 63:
+                    raise ValueError(f"Invalid polyline character '{encoded[index - 1]}'")
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
+
+
+def expand_bbox(min_lat: float, max_lat: float, min_lon: float, max_lon: float, km: float) -> BoundingBox:
+    """
+    Grow a latitude/longitude box by the given distance on every side. The longitude margin uses the latitude furthest
+    from the equator so the result always contains every point within km of the original box.
+    """
+    lat_margin = km / KM_PER_DEGREE
+    widest = min(89.9, max(abs(min_lat), abs(max_lat)) + lat_margin)
+    lon_margin = km / (KM_PER_DEGREE * cos(radians(widest)))
+    return min_lat - lat_margin, max_lat + lat_margin, min_lon - lon_margin, max_lon + lon_margin
+
+
+def bounding_box(latitude: float, longitude: float, km: float) -> BoundingBox:
+    """Smallest latitude/longitude box containing every point within km of the given point."""
+    return expand_bbox(latitude, latitude, longitude, longitude, km)
+
+
+class EquirectangularProjection:
+    """
+    Projects latitude/longitude onto a plane in kilometres, scaled at a reference latitude. Over city-sized areas the
+    error is well below a metre per kilometre, which is plenty for buffer checks, and plain planar geometry (such as
+    point to segment distances) can be used on the result.
+    """
+
+    def __init__(self, reference_latitude: float):
+        self._x_scale = KM_PER_DEGREE * cos(radians(reference_latitude))
+        self._y_scale = KM_PER_DEGREE
+
+    def project(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        return longitude * self._x_scale, latitude * self._y_scale
+
+
+def point_segment_distance(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> Tuple[float, float]:
+    """
+    Planar distance from point p to the segment a-b, together with the fraction (0.0 - 1.0) along the segment at
+    which the closest point lies.
+    """
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    cx, cy = ax + t * dx - px, ay + t * dy - py
+    return sqrt(cx * cx + cy * cy), t
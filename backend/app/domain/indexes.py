@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from app.domain.models import FoodProvider, to_epoch_seconds
+
+
+class SortedIndex:
+    """
+    Secondary index over a sortable key. Keys are kept in a sorted list next to the position of the provider they
+    belong to, so that range queries are answered with two bisects instead of a full scan.
+    """
+
+    def __init__(self, keys: List[int], positions: List[int]):
+        self._keys = keys
+        self._positions = positions
+
+    @classmethod
+    def build(cls, providers: Sequence[FoodProvider],
+              key: Callable[[FoodProvider], Optional[int]]) -> "SortedIndex":
+        entries = []
+        for position, provider in enumerate(providers):
+            value = key(provider)
+            if value is not None:
+                entries.append((value, position))
+        entries.sort()
+        return cls([k for k, _ in entries], [p for _, p in entries])
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def range(self, low: Optional[int] = None, high: Optional[int] = None) -> List[int]:
+        """Return the positions of all providers whose key lies within [low, high]. Open bounds may be None."""
+        start = 0 if low is None else bisect_left(self._keys, low)
+        end = len(self._keys) if high is None else bisect_right(self._keys, high)
+        return self._positions[start:end]
+
+    def count(self, low: Optional[int] = None, high: Optional[int] = None) -> int:
+        """Number of positions range(low, high) would return, without building the list."""
+        start = 0 if low is None else bisect_left(self._keys, low)
+        end = len(self._keys) if high is None else bisect_right(self._keys, high)
+        return max(0, end - start)
+
+
+class GeoIndex:
+    """
+    Spatial index for bounding box queries. Providers are sorted by latitude with their longitude kept alongside, so a
+    query bisects to the latitude band of the box and only checks longitudes within that band.
+    """
+
+    def __init__(self, latitudes: List[float], longitudes: List[float], positions: List[int]):
+        self._latitudes = latitudes
+        self._longitudes = longitudes
+        self._positions = positions
+        self._longitude_span = max(longitudes) - min(longitudes) if longitudes else 0.0
+
+    @classmethod
+    def build(cls, providers: Sequence[FoodProvider],
+              key: Callable[[FoodProvider], Optional[Tuple[float, float]]]) -> "GeoIndex":
+        entries = []
+        for position, provider in enumerate(providers):
+            value = key(provider)
+            if value is not None:
+                entries.append((value[0], value[1], position))
+        entries.sort()
+        return cls([e[0] for e in entries], [e[1] for e in entries], [e[2] for e in entries])
+
+    def __len__(self) -> int:
+        return len(self._latitudes)
+
+    def bbox(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> List[int]:
+        """Return the positions of all providers located within the box, bounds inclusive."""
+        start = bisect_left(self._latitudes, min_lat)
+        end = bisect_right(self._latitudes, max_lat)
+        longitudes = self._longitudes
+        positions = self._positions
+        return [positions[i] for i in range(start, end) if min_lon <= longitudes[i] <= max_lon]
+
+    def bbox_entries(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float
+                     ) -> List[Tuple[float, float, int]]:
+        """Like bbox(), but (latitude, longitude, position) of every provider within the box."""
+        start = bisect_left(self._latitudes, min_lat)
+        end = bisect_right(self._latitudes, max_lat)
+        longitudes = self._longitudes
+        return [(self._latitudes[i], longitudes[i], self._positions[i]) for i in range(start, end)
+                if min_lon <= longitudes[i] <= max_lon]
+
+    def estimate_bbox(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> float:
+        """
+        Estimated number of positions bbox() would return: the exact size of the latitude band, scaled by the share
+        of the indexed longitude span the box covers, i.e. assuming longitudes are spread evenly within the band.
+        """
+        band = bisect_right(self._latitudes, max_lat) - bisect_left(self._latitudes, min_lat)
+        if band <= 0:
+            return 0.0
+        if self._longitude_span <= 0:
+            return float(band)
+        return band * max(0.0, min(1.0, (max_lon - min_lon) / self._longitude_span))
+
+
+def _expiration_key(provider: FoodProvider) -> Optional[int]:
+    return to_epoch_seconds(provider.permit.expirationDate)
+
+
+def _approval_key(provider: FoodProvider) -> Optional[int]:
+    return to_epoch_seconds(provider.permit.approvalDate)
+
+
+def _received_key(provider: FoodProvider) -> Optional[int]:
+    return to_epoch_seconds(provider.permit.recievedDate)
+
+
+def _location_key(provider: FoodProvider) -> Optional[Tuple[float, float]]:
+    coord = provider.coord
+    if coord is None or coord.latitude is None or coord.longitude is None:
+        return None
+    # 0.0 / 0.0 is how upstream marks an unknown location
+    if coord.latitude == 0.0 and coord.longitude == 0.0:
+        return None
+    return coord.latitude, coord.longitude
+
+
+class FoodProviderIndexes:
+    """Secondary indexes built alongside each repository snapshot."""
+
+    def __init__(self, expiration: SortedIndex, approval: SortedIndex, received: SortedIndex, location: GeoIndex):
+        self.expiration = expiration
+        self.approval = approval
+        self.received = received
+        self.location = location
+
+    @classmethod
+    def build(cls, providers: Sequence[FoodProvider],
+              expiration: Callable[[FoodProvider], Optional[int]] = _expiration_key,
+              approval: Callable[[FoodProvider], Optional[int]] = _approval_key,
+              received: Callable[[FoodProvider], Optional[int]] = _received_key,
+              location: Callable[[FoodProvider], Optional[Tuple[float, float]]] = _location_key
+              ) -> "FoodProviderIndexes":
+        """
+        Build all indexes. Storage adapters may pass their own key functions when they can produce the epoch
+        seconds of a permit date more cheaply than going through the datetime attributes.
+        """
+        return cls(
+            expiration=SortedIndex.build(providers, expiration),
+            approval=SortedIndex.build(providers, approval),
+            received=SortedIndex.build(providers, received),
+            location=GeoIndex.build(providers, location),
+        )
+
+    @classmethod
+    def empty(cls) -> "FoodProviderIndexes":
+        return cls.build(())
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from math import radians, atan2, sin, sqrt, cos
 from typing import Optional
@@ -21,6 +21,25 @@ def parse_int(value):
         raise ValidationError('Value not parseable as int')
 
 
+def to_epoch_seconds(value: Optional[datetime]) -> Optional[int]:
+    # Upstream dates are mostly naive; treat them as UTC so they compare consistently with aware datetimes
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    R = 6371.0  # Earth radius in km
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return R * c
+
+
 Longitude = Annotated[float, BeforeValidator(parse_float)]
 Latitude = Annotated[float, BeforeValidator(parse_float)]
 
@@ -30,15 +49,6 @@ class Coordinate(BaseModel):
     latitude: Latitude
 
     def distance_to(self, other: 'Coordinate') -> float:
-        def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-            R = 6371.0  # Earth radius in km
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-            c = 2 * atan2(sqrt(a), sqrt(1 - a))
-            return R * c
-
         return haversine_distance(other.latitude, other.longitude, self.latitude, self.longitude)
 
     @field_validator('longitude', mode='after')
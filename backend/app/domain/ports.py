@@ -1,11 +1,81 @@
+import math
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, Iterable, List
 
 from app.domain.models import FoodProvider
 from app.domain.specification import Specification
 
 
+class FoodProviderSnapshot(ABC):
+    """
+    Read-only, immutable view of the repository contents at a single point in time. Request handlers should take one
+    snapshot and run all of their queries against it so that a concurrent replace_all cannot change the data set
+    partway through a request.
+    """
+
+    @property
+    @abstractmethod
+    def generation(self) -> int:
+        """
+        Monotonically increasing identifier of this snapshot. Two snapshots with the same generation hold the same data.
+        """
+
+    @abstractmethod
+    def get_all(self) -> List[FoodProvider]:
+        """
+        Return all applicants in this snapshot.
+        """
+
+    @abstractmethod
+    def get_by_spec(self, spec: Specification[FoodProvider]) -> List[FoodProvider]:
+        """
+        Return all applicants in this snapshot matching the given spec.
+        """
+
+    def estimate_cost(self, spec: Specification[FoodProvider]) -> float:
+        """
+        Estimated relative cost of get_by_spec for the given spec (candidates scanned plus results produced), used to
+        decide whether a query may run on the event loop. Unknown costs are treated as expensive.
+        """
+        return math.inf
+
+
+class FoodProviderRepositoryBuilder(ABC):
+    """
+    Incrementally assembles the next generation of a repository, e.g. one page of an upstream fetch at a time, so
+    that an ingest never needs the complete data set in memory as domain models. Nothing is visible to readers until
+    commit is called.
+    """
+
+    @abstractmethod
+    def add(self, providers: Iterable[FoodProvider]):
+        """
+        Add a batch of providers to the generation being built.
+        """
+
+    @abstractmethod
+    def commit(self) -> int:
+        """
+        Atomically replace the repository contents with everything added so far. Returns the number of providers
+        stored.
+        """
+
+
+class _ReplaceAllBuilder(FoodProviderRepositoryBuilder):
+    # Fallback for repositories without an incremental builder: collect everything and call replace_all
+    def __init__(self, repository: "FoodProviderRepository"):
+        self._repository = repository
+        self._providers: List[FoodProvider] = []
+
+    def add(self, providers: Iterable[FoodProvider]):
+        self._providers.extend(providers)
+
+    def commit(self) -> int:
+        self._repository.replace_all(self._providers)
+        return len(self._providers)
+
+
 class FoodProviderRepository(ABC):
     """Port responsible for persisting domain Models"""
 
@@ -14,7 +84,21 @@ class FoodProviderRepository(ABC):
         """
         Replace the entire stored collection with the provided providers. This could be replaced later by
         a more granular update method that potentially only updates outdated records. We could compare versions of data
-        by hashing the rows when received and storing the hash alongside the domain objects
+        by hashing the rows when received and storing the hash alongside the domain objects.
+        Implementations must publish the new collection atomically so that it is safe to call off the event loop.
+        """
+
+    def builder(self) -> FoodProviderRepositoryBuilder:
+        """
+        Return a builder for the next generation of the stored collection. Implementations should override this to
+        build their storage incrementally; the default simply collects the providers and calls replace_all.
+        """
+        return _ReplaceAllBuilder(self)
+
+    @abstractmethod
+    def snapshot(self) -> FoodProviderSnapshot:
+        """
+        Return the current generation of the stored collection.
         """
 
     @abstractmethod
@@ -43,10 +127,19 @@ class FoodProviderDataClient(ABC):
         Fetch and return all providers from the external API as raw dict rows.
         """
 
+    async def stream_pages(self) -> AsyncIterator[List[dict]]:
+        """
+        Fetch providers from the external API as successive pages of raw dict rows. Pages should only be requested
+        from upstream as the consumer asks for them, so that at most a page or two is held in memory at once.
+        Default: a single page containing the result of fetch_all.
+        """
+        yield await self.fetch_all()
+
     @abstractmethod
     def map_results(self, results: List[dict]) -> List[FoodProvider]:
         """
         Map raw result rows into domain FoodProvider objects. May use update_time for metadata.
+        Called once per page when streaming.
         """
 
     @abstractmethod
@@ -1,10 +1,22 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Iterable, List
+from typing import Any, Dict, Generic, TypeVar, Iterable, List, Optional, Set
 
 T = TypeVar("T")
 
+# Default estimates for specifications that do not provide their own
+DEFAULT_COST = 1.0
+DEFAULT_SELECTIVITY = 0.5
+
+
+def _merge_annotations(specs: List["Specification[T]"], candidate: T) -> Dict[str, Any]:
+    # Earlier specifications win when several annotate the same field, mirroring how ordering favors the left child
+    result: Dict[str, Any] = {}
+    for spec in reversed(specs):
+        result.update(spec.annotate(candidate))
+    return result
+
 
 def _has_custom_order(spec: "Specification[T]") -> bool:
     # Detect if a specification overrides the default order implementation
@@ -32,6 +44,52 @@ class Specification(ABC, Generic[T]):
         """
         return items
 
+    def annotate(self, candidate: T) -> Dict[str, Any]:
+        """
+        Optional annotation hook. Return values the specification computed for a matching item (e.g. a distance) keyed
+        by field name, so callers can pass them on instead of computing them again. By default, returns nothing.
+        """
+        return {}
+
+    def cost(self, stats: Any = None) -> float:
+        """
+        Relative cost of a single is_satisfied_by call. Used only to decide evaluation order, never results.
+        """
+        return DEFAULT_COST
+
+    def selectivity(self, stats: Any = None) -> float:
+        """
+        Estimated fraction of candidates that satisfy this specification (0.0 - 1.0), given repository statistics.
+        """
+        return DEFAULT_SELECTIVITY
+
+    def candidates(self, indexes: Any) -> Optional[Set[int]]:
+        """
+        Optional index hook. Return the positions of every item that could possibly satisfy this specification using
+        the repository's secondary indexes, or None when the specification cannot be answered from an index. The
+        candidates are still checked with is_satisfied_by, so a superset is fine.
+        """
+        return None
+
+    def estimate_candidates(self, indexes: Any) -> Optional[float]:
+        """
+        Estimated size of what candidates() would return, computed from index bounds without building the set.
+        Used for cost estimates that must stay cheap enough to run on the event loop. None when no index applies.
+        """
+        return None
+
+    def result_limit(self) -> Optional[int]:
+        """Maximum number of items order() returns, or None when it returns every item it is given."""
+        return None
+
+    def optimize(self, stats: Any = None) -> "Specification[T]":
+        """
+        Return an equivalent specification for filtering whose composite children are flattened and reordered so the
+        cheapest, most selective predicates are evaluated first. The returned specification filters exactly like this
+        one, but ordering should still be delegated to the original specification.
+        """
+        return self
+
     def __and__(self, other: "Specification[T]") -> "Specification[T]":
         return AndSpecification(self, other)
 
@@ -50,6 +108,28 @@ class AndSpecification(Specification[T]):
     def is_satisfied_by(self, candidate: T) -> bool:
         return self.left.is_satisfied_by(candidate) and self.right.is_satisfied_by(candidate)
 
+    def cost(self, stats: Any = None) -> float:
+        return self.optimize(stats).cost(stats)
+
+    def selectivity(self, stats: Any = None) -> float:
+        return self.left.selectivity(stats) * self.right.selectivity(stats)
+
+    def candidates(self, indexes: Any) -> Optional[Set[int]]:
+        return _narrowest(self.left.candidates(indexes), self.right.candidates(indexes))
+
+    def estimate_candidates(self, indexes: Any) -> Optional[float]:
+        return _smallest([self.left.estimate_candidates(indexes), self.right.estimate_candidates(indexes)])
+
+    def result_limit(self) -> Optional[int]:
+        return _ordering_limit([self.left, self.right])
+
+    def optimize(self, stats: Any = None) -> Specification[T]:
+        children = [c.optimize(stats) for c in _flatten(self, AndSpecification)]
+        return AllOfSpecification(_sort_by_rank(children, stats, _and_rank))
+
+    def annotate(self, candidate: T) -> Dict[str, Any]:
+        return _merge_annotations([self.left, self.right], candidate)
+
     def order(self, items: List[T]) -> List[T]:
         # Prefer a child that provides a custom ordering. Deterministically favor left when both do.
         if _has_custom_order(self.left):
@@ -67,6 +147,30 @@ class OrSpecification(Specification[T]):
     def is_satisfied_by(self, candidate: T) -> bool:
         return self.left.is_satisfied_by(candidate) or self.right.is_satisfied_by(candidate)
 
+    def cost(self, stats: Any = None) -> float:
+        return self.optimize(stats).cost(stats)
+
+    def selectivity(self, stats: Any = None) -> float:
+        left = self.left.selectivity(stats)
+        right = self.right.selectivity(stats)
+        return left + right - left * right
+
+    def candidates(self, indexes: Any) -> Optional[Set[int]]:
+        return _union([self.left.candidates(indexes), self.right.candidates(indexes)])
+
+    def estimate_candidates(self, indexes: Any) -> Optional[float]:
+        return _total([self.left.estimate_candidates(indexes), self.right.estimate_candidates(indexes)])
+
+    def result_limit(self) -> Optional[int]:
+        return _ordering_limit([self.left, self.right])
+
+    def optimize(self, stats: Any = None) -> Specification[T]:
+        children = [c.optimize(stats) for c in _flatten(self, OrSpecification)]
+        return AnyOfSpecification(_sort_by_rank(children, stats, _or_rank))
+
+    def annotate(self, candidate: T) -> Dict[str, Any]:
+        return _merge_annotations([self.left, self.right], candidate)
+
     def order(self, items: List[T]) -> List[T]:
         if _has_custom_order(self.left):
             return self.left.order(items)
@@ -82,8 +186,163 @@ class NotSpecification(Specification[T]):
     def is_satisfied_by(self, candidate: T) -> bool:
         return not self.spec.is_satisfied_by(candidate)
 
+    def cost(self, stats: Any = None) -> float:
+        return self.spec.cost(stats)
+
+    def selectivity(self, stats: Any = None) -> float:
+        return 1.0 - self.spec.selectivity(stats)
+
+    def optimize(self, stats: Any = None) -> Specification[T]:
+        return NotSpecification(self.spec.optimize(stats))
+
+    def annotate(self, candidate: T) -> Dict[str, Any]:
+        return self.spec.annotate(candidate)
+
+    def result_limit(self) -> Optional[int]:
+        return _ordering_limit([self.spec])
+
     def order(self, items: List[T]) -> List[T]:
         # Negation does not define its own order; delegate if inner has custom ordering.
         if _has_custom_order(self.spec):
             return self.spec.order(items)
         return items
+
+
+class AllOfSpecification(Specification[T]):
+    """
+    Flattened conjunction produced by AndSpecification.optimize. Children are evaluated in the given order and
+    evaluation stops at the first child that is not satisfied.
+    """
+
+    def __init__(self, specs: List[Specification[T]]):
+        self.specs = specs
+
+    def is_satisfied_by(self, candidate: T) -> bool:
+        for spec in self.specs:
+            if not spec.is_satisfied_by(candidate):
+                return False
+        return True
+
+    def cost(self, stats: Any = None) -> float:
+        # Expected cost: each child only runs for the fraction of candidates that passed the ones before it
+        total, reach = 0.0, 1.0
+        for spec in self.specs:
+            total += reach * spec.cost(stats)
+            reach *= spec.selectivity(stats)
+        return total
+
+    def selectivity(self, stats: Any = None) -> float:
+        result = 1.0
+        for spec in self.specs:
+            result *= spec.selectivity(stats)
+        return result
+
+    def candidates(self, indexes: Any) -> Optional[Set[int]]:
+        result = None
+        for spec in self.specs:
+            result = _narrowest(result, spec.candidates(indexes))
+        return result
+
+    def estimate_candidates(self, indexes: Any) -> Optional[float]:
+        return _smallest([spec.estimate_candidates(indexes) for spec in self.specs])
+
+    def annotate(self, candidate: T) -> Dict[str, Any]:
+        return _merge_annotations(self.specs, candidate)
+
+
+class AnyOfSpecification(Specification[T]):
+    """
+    Flattened disjunction produced by OrSpecification.optimize. Children are evaluated in the given order and
+    evaluation stops at the first child that is satisfied.
+    """
+
+    def __init__(self, specs: List[Specification[T]]):
+        self.specs = specs
+
+    def is_satisfied_by(self, candidate: T) -> bool:
+        for spec in self.specs:
+            if spec.is_satisfied_by(candidate):
+                return True
+        return False
+
+    def cost(self, stats: Any = None) -> float:
+        total, reach = 0.0, 1.0
+        for spec in self.specs:
+            total += reach * spec.cost(stats)
+            reach *= 1.0 - spec.selectivity(stats)
+        return total
+
+    def selectivity(self, stats: Any = None) -> float:
+        miss = 1.0
+        for spec in self.specs:
+            miss *= 1.0 - spec.selectivity(stats)
+        return 1.0 - miss
+
+    def candidates(self, indexes: Any) -> Optional[Set[int]]:
+        return _union([spec.candidates(indexes) for spec in self.specs])
+
+    def estimate_candidates(self, indexes: Any) -> Optional[float]:
+        return _total([spec.estimate_candidates(indexes) for spec in self.specs])
+
+    def annotate(self, candidate: T) -> Dict[str, Any]:
+        return _merge_annotations(self.specs, candidate)
+
+
+def _flatten(spec: Specification[T], kind: type) -> List[Specification[T]]:
+    # Collapse nested chains of the same operator, e.g. (a & b) & c -> [a, b, c], preserving left-to-right order
+    if isinstance(spec, kind):
+        return _flatten(spec.left, kind) + _flatten(spec.right, kind)
+    return [spec]
+
+
+def _narrowest(a: Optional[Set[int]], b: Optional[Set[int]]) -> Optional[Set[int]]:
+    # Any child's candidates bound a conjunction; the smallest set is the cheapest to verify
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a if len(a) <= len(b) else b
+
+
+def _union(sets: List[Optional[Set[int]]]) -> Optional[Set[int]]:
+    # A disjunction can only be answered from indexes when every child can
+    if any(s is None for s in sets):
+        return None
+    return set().union(*sets)
+
+
+def _smallest(estimates: List[Optional[float]]) -> Optional[float]:
+    # Estimate counterpart of _narrowest
+    known = [e for e in estimates if e is not None]
+    return min(known) if known else None
+
+
+def _total(estimates: List[Optional[float]]) -> Optional[float]:
+    # Estimate counterpart of _union; overlapping children are counted twice, which only overestimates
+    if any(e is None for e in estimates):
+        return None
+    return sum(estimates)
+
+
+def _ordering_limit(specs: List[Specification[T]]) -> Optional[int]:
+    # Composites delegate order() to the first child with a custom order, so that child's limit applies
+    for spec in specs:
+        if _has_custom_order(spec):
+            return spec.result_limit()
+    return None
+
+
+def _and_rank(spec: Specification[T], stats: Any) -> float:
+    # Classic predicate ordering: cost per unit of rejected candidates, lowest first
+    rejected = 1.0 - spec.selectivity(stats)
+    return spec.cost(stats) / rejected if rejected > 0 else float("inf")
+
+
+def _or_rank(spec: Specification[T], stats: Any) -> float:
+    accepted = spec.selectivity(stats)
+    return spec.cost(stats) / accepted if accepted > 0 else float("inf")
+
+
+def _sort_by_rank(specs: List[Specification[T]], stats: Any, rank) -> List[Specification[T]]:
+    # Stable sort so that ties keep the order in which the specifications were composed
+    return sorted(specs, key=lambda s: rank(s, stats))
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from app.domain.models import FoodProvider, PermitStatus
+
+# Number of lower-cased names/addresses kept around for estimating substring selectivity
+SAMPLE_SIZE = 256
+
+
+class FoodProviderStatistics:
+    """
+    Summary statistics over a collection of providers. These are collected once when the repository is replaced and
+    are used by specifications to estimate how selective and how expensive they are, so that composite specifications
+    can evaluate their cheapest, most selective children first.
+    """
+
+    def __init__(self, total: int = 0, status_counts: Dict[PermitStatus, int] | None = None,
+                 with_coord: int = 0, avg_name_length: float = 0.0, avg_address_length: float = 0.0,
+                 name_sample: List[str] | None = None, address_sample: List[str] | None = None):
+        self.total = total
+        self.status_counts: Dict[PermitStatus, int] = status_counts or {}
+        self.with_coord = with_coord
+        self.avg_name_length = avg_name_length
+        self.avg_address_length = avg_address_length
+        self.name_sample: List[str] = name_sample or []
+        self.address_sample: List[str] = address_sample or []
+
+    @classmethod
+    def from_providers(cls, providers: Iterable[FoodProvider]) -> "FoodProviderStatistics":
+        providers = list(providers)
+        total = len(providers)
+        if total == 0:
+            return cls()
+
+        status_counts: Counter = Counter()
+        with_coord = 0
+        name_length = 0
+        address_length = 0
+        for p in providers:
+            if p.permit is not None:
+                status_counts[p.permit.permitStatus] += 1
+            if p.coord is not None:
+                with_coord += 1
+            name_length += len(p.name or "")
+            address_length += len(p.address or "")
+
+        # Evenly spaced sample so the estimate is deterministic for a given data set
+        step = max(1, total // SAMPLE_SIZE)
+        sampled = providers[::step][:SAMPLE_SIZE]
+
+        return cls(
+            total=total,
+            status_counts=dict(status_counts),
+            with_coord=with_coord,
+            avg_name_length=name_length / total,
+            avg_address_length=address_length / total,
+            name_sample=[(p.name or "").lower() for p in sampled],
+            address_sample=[(p.address or "").lower() for p in sampled],
+        )
+
+    def status_fraction(self, status: PermitStatus) -> float:
+        if self.total == 0:
+            return 1.0
+        return self.status_counts.get(status, 0) / self.total
+
+    def coord_fraction(self) -> float:
+        if self.total == 0:
+            return 1.0
+        return self.with_coord / self.total
+
+
+def substring_fraction(term: str, sample: List[str]) -> float:
+    """Estimate the fraction of values containing the given term from a sample of lower-cased values."""
+    if not sample:
+        return 0.5
+    term = term.lower()
+    hits = sum(1 for value in sample if term in value)
+    # Never estimate exactly zero; the sample may simply have missed the matching rows
+    return max(hits, 0.5) / len(sample)
@@ -1,19 +1,38 @@
+import enum
+import hashlib
+import json
 import logging
+import os
+import re
+import typing
 from contextlib import asynccontextmanager
+from pathlib import Path
 
 from fastapi import FastAPI, Depends
+from fastapi.dependencies.utils import get_flat_dependant
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
 
-from app.dependencies import get_repository, initialize, shutdown
-from app.routers import foodprovider
+from app.dependencies import data_manager, get_repository, initialize, shutdown
+from app.routers import admin, export, foodprovider
 
 logging.basicConfig(level=logging.INFO, force=True)
 
+logger = logging.getLogger(__name__)
+
+# Startup-optimized mode: serve the checked-in OpenAPI schema instead of generating it on the first docs request
+FAST_STARTUP = os.environ.get("FAST_STARTUP", "").lower() in ("1", "true", "yes")
+PREBUILT_OPENAPI_PATH = Path(__file__).resolve().parent.parent / "openapi.json"
+# Key of the prebuilt schema that holds the route signature it was generated from; stripped before serving
+ROUTE_SIGNATURE_KEY = "x-route-signature"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await initialize()
     yield
     await shutdown()
+    export.dataset_exporter.close()
 
 
 app = FastAPI(
@@ -30,8 +49,103 @@ app = FastAPI(
 )
 
 app.include_router(foodprovider.router)
+app.include_router(export.router)
+app.include_router(admin.router)
+
+# Render the full-data-set exports once per update instead of on the first download request
+data_manager.add_listener(export.dataset_exporter.render)
 
 
 @app.get("/health", include_in_schema=False)
 async def health_check():
     return {"status": "ok"}
+
+
+def _field_signature(field_info) -> str:
+    # FastAPI's Query/Path/... only show their default in repr(), the representation arguments have every attribute
+    return f"{type(field_info).__name__}{list(field_info.__repr_args__())!r}"
+
+
+def _type_signature(annotation, seen: set) -> str:
+    # Structural description of a type, following the fields of models and the members of enums
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        name = f"{annotation.__module__}.{annotation.__qualname__}"
+        if annotation in seen:
+            return name
+        seen.add(annotation)
+        fields = ", ".join(f"{field_name}={_field_signature(field)}: {_type_signature(field.annotation, seen)}"
+                           for field_name, field in annotation.model_fields.items())
+        return f"{name}({fields})"
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return f"{annotation.__qualname__}{[member.value for member in annotation]}"
+    args = typing.get_args(annotation)
+    if args:
+        return f"{typing.get_origin(annotation)!r}[{', '.join(_type_signature(a, seen) for a in args)}]"
+    return repr(annotation)
+
+
+def route_signature() -> str:
+    """
+    Hash of everything the OpenAPI schema is generated from: the app metadata and, for every documented route, its
+    path, methods, documentation, responses, parameters and response model. Much cheaper than generating the schema,
+    and any change to one of them changes the hash even when the app version was not bumped.
+    """
+    seen = set()
+    parts = [repr((app.title, app.description, app.version, app.contact))]
+    for route in app.routes:
+        if not (isinstance(route, APIRoute) and route.include_in_schema):
+            continue
+        dependant = get_flat_dependant(route.dependant)
+        params = [
+            (kind, param.name, _field_signature(param.field_info), repr(param.default),
+             _type_signature(param.field_info.annotation, seen))
+            for kind, fields in (("path", dependant.path_params), ("query", dependant.query_params),
+                                 ("header", dependant.header_params), ("cookie", dependant.cookie_params),
+                                 ("body", dependant.body_params))
+            for param in fields
+        ]
+        parts.append(repr((
+            route.path, sorted(route.methods), route.name, route.operation_id, route.summary, route.description,
+            route.response_description, route.tags, route.status_code, route.deprecated, route.responses, params,
+            _type_signature(route.response_model, seen),
+        )))
+    # Reprs of validators and other functions carry their memory address, which differs from process to process
+    text = re.sub(r" at 0x[0-9a-f]+", "", "\n".join(parts))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _schema_matches_routes(schema: dict) -> bool:
+    # The prebuilt schema must have been generated from exactly the routes and models that are mounted
+    return schema.get(ROUTE_SIGNATURE_KEY) == route_signature()
+
+
+def generate_prebuilt_openapi() -> dict:
+    """Generate the schema for PREBUILT_OPENAPI_PATH, stamped with the current route signature."""
+    schema = dict(FastAPI.openapi(app))
+    schema[ROUTE_SIGNATURE_KEY] = route_signature()
+    return schema
+
+
+def prebuilt_openapi() -> dict:
+    if app.openapi_schema:
+        return app.openapi_schema
+    try:
+        schema = json.loads(PREBUILT_OPENAPI_PATH.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unable to load prebuilt OpenAPI schema: {e}")
+        schema = None
+    if schema is not None and _schema_matches_routes(schema):
+        del schema[ROUTE_SIGNATURE_KEY]
+        app.openapi_schema = schema
+        return schema
+    logger.warning("Prebuilt OpenAPI schema does not match the mounted routes, generating it instead")
+    return FastAPI.openapi(app)
+
+
+if FAST_STARTUP:
+    app.openapi = prebuilt_openapi
+
+
+if __name__ == "__main__":
+    # Regenerate the prebuilt schema: python -m app.main
+    PREBUILT_OPENAPI_PATH.write_text(json.dumps(generate_prebuilt_openapi(), indent=2) + "\n")
@@ -0,0 +1,47 @@
+import hmac
+import os
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.dependencies import data_manager
+
+# Shared secret for the refresh endpoint. The endpoint is disabled while it is unset.
+REFRESH_TOKEN_ENV = "REFRESH_TOKEN"
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    tags=["admin"],
+)
+
+
+def _authorize(authorization: Optional[str]):
+    expected = os.environ.get(REFRESH_TOKEN_ENV, "")
+    if expected == "":
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    scheme, _, token = (authorization or "").partition(" ")
+    # Constant-time comparison, so response timing does not reveal how much of the token matched
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), expected.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or missing refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.post(
+    "/refresh",
+    status_code=202,
+    summary="Refresh the data set from upstream",
+    description="Wake the background data manager and re-fetch every upstream data source now instead of waiting for "
+                "the next scheduled poll. Requires the token configured in the REFRESH_TOKEN environment variable as "
+                "a bearer token. Bursts of requests are debounced into a single fetch.",
+    response_description="The refresh was scheduled",
+    responses={401: {"description": "Invalid or missing token"},
+               404: {"description": "Refresh endpoint is not enabled"}},
+)
+async def refresh(authorization: Annotated[Optional[str], Header()] = None):
+    _authorize(authorization)
+    data_manager.refresh()
+    return {"status": "scheduled"}
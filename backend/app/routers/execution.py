@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(Exception):
+    """Raised when an expensive query cannot be admitted because the worker pool and its queue are full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Query executor saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class QueryExecutor:
+    """
+    Decides where a query runs based on its estimated cost. Cheap queries run inline on the event loop, which avoids
+    a thread hop for the common case. Queries above the cost threshold run in a bounded thread pool so that broad scans
+    and large sorts cannot block the loop (and with it /health and every cheap lookup).
+
+    Admission control: at most max_workers expensive queries run at once and at most max_queue wait for a worker.
+    Anything beyond that is rejected immediately with ExecutorSaturated rather than piling up.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16, cost_threshold: float = 20_000.0,
+                 retry_after: int = 1):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.cost_threshold = cost_threshold
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        # Only touched from the event loop thread, so a plain counter is enough
+        self._admitted = 0
+
+    @property
+    def admitted(self) -> int:
+        """Number of expensive queries currently running or waiting for a worker."""
+        return self._admitted
+
+    async def run(self, fn: Callable[[], T], cost: float) -> T:
+        if cost < self.cost_threshold:
+            return fn()
+
+        if self._admitted >= self.max_workers + self.max_queue:
+            raise ExecutorSaturated(self.retry_after)
+
+        self._admitted += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn)
+        finally:
+            self._admitted -= 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
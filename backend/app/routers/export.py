@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import math
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Annotated, BinaryIO, Collection, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import get_repository, query_executor
+from app.domain.ports import FoodProviderRepository, FoodProviderSnapshot
+from app.routers.execution import ExecutorSaturated
+from app.routers.foodprovider import FoodProviderResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1/food-providers",
+    dependencies=[Depends(get_repository)],
+    tags=["food-providers"],
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+CSV_COLUMNS = [
+    "locationId", "name", "foodItems", "permitStatus", "permitID", "approvalDate", "recievedDate", "expirationDate",
+    "latitude", "longitude", "locationDescription", "blocklot", "block", "lot", "cnn", "address",
+]
+
+# Query-specific response fields that have no meaning in a full export
+_EXCLUDED_FIELDS = {"distance_km"}
+
+# Content codings in order of preference when the client accepts several
+ENCODINGS = ("zstd", "gzip", "identity")
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Bytes read from an export file per chunk of a response
+CHUNK_SIZE = 64 * 1024
+
+
+def _zstd_compress(data: bytes) -> Optional[bytes]:
+    # zstd is optional: only offered when the zstandard package is installed
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor(level=10).compress(data)
+
+
+def _render_ndjson(rows: List[FoodProviderResponse]) -> bytes:
+    out = io.StringIO()
+    for row in rows:
+        out.write(row.model_dump_json(by_alias=True, exclude=_EXCLUDED_FIELDS))
+        out.write("\n")
+    return out.getvalue().encode()
+
+
+def _render_csv(rows: List[FoodProviderResponse]) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        data = row.model_dump(mode="json", by_alias=True, exclude=_EXCLUDED_FIELDS)
+        # Flatten the nested permit and coordinate into top-level columns
+        data.update(data.pop("permit"))
+        data.update(data.pop("coord"))
+        writer.writerow(data)
+    return out.getvalue().encode()
+
+
+class ExportArtifact:
+    """
+    A rendered export of one generation in one format, written to disk in every available content coding. Only the
+    file names, sizes and validators are kept in memory.
+    """
+
+    def __init__(self, generation: int, fmt: str, body: bytes, directory: Path):
+        self.generation = generation
+        self.media_type = MEDIA_TYPES[fmt]
+        self.filename = f"food-providers-{generation}.{fmt}"
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        encoded = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        zstd_body = _zstd_compress(body)
+        if zstd_body is not None:
+            encoded["zstd"] = zstd_body
+        self.paths: Dict[str, Path] = {}
+        self.sizes: Dict[str, int] = {}
+        for encoding, data in encoded.items():
+            path = directory / f"{self.filename}.{encoding}"
+            path.write_bytes(data)
+            self.paths[encoding] = path
+            self.sizes[encoding] = len(data)
+        # Each coding is a different representation and therefore gets its own strong validator
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in self.paths}
+
+
+class DatasetExporter:
+    """
+    Renders the complete data set once per repository generation, as NDJSON and CSV, and writes the results to a
+    temporary directory so a full dump costs a file send instead of a scan plus serialization per request, without
+    holding every coding of every format in memory. The files of the previous generation are kept for responses that
+    are still streaming them, older ones are deleted.
+
+    A render in progress is published as a future, so concurrent requests await it from the event loop instead of
+    each holding a worker thread until it finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # The snapshot and its artifacts are replaced together, so readers never see a mismatched pair
+        self._current: Tuple[Optional[FoodProviderSnapshot], Dict[str, ExportArtifact]] = (None, {})
+        self._inflight: Optional[Tuple[FoodProviderSnapshot, Future]] = None
+        self._directory: Optional[Path] = None
+        # Directories of the rendered generations, oldest first
+        self._rendered: List[Path] = []
+
+    def _render_directory(self, generation: int) -> Path:
+        with self._lock:
+            if self._directory is None:
+                self._directory = Path(tempfile.mkdtemp(prefix="food-provider-exports-"))
+            directory = self._directory / str(generation)
+        # A render that failed part way may have left files behind
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir()
+        return directory
+
+    def close(self):
+        """Delete every rendered file. Later renders start a new directory."""
+        with self._lock:
+            directory, self._directory = self._directory, None
+            self._current = (None, {})
+            self._rendered = []
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def lookup(self, snapshot: FoodProviderSnapshot) -> Optional[Dict[str, ExportArtifact]]:
+        """The rendered artifacts of the given snapshot, or None when they have not been rendered yet."""
+        # Snapshots are immutable, so identity is an exact and cheap cache key
+        current, artifacts = self._current
+        return artifacts if current is snapshot else None
+
+    def claim(self, snapshot: FoodProviderSnapshot) -> Tuple[Future, bool]:
+        """
+        Return the future that receives the artifacts of the given snapshot, and whether the caller owns the render.
+        The owner must finish it with produce() (or abandon() when it cannot run it), everyone else only waits.
+        """
+        with self._lock:
+            artifacts = self.lookup(snapshot)
+            if artifacts is not None:
+                future: Future = Future()
+                future.set_result(artifacts)
+                return future, False
+            if self._inflight is not None and self._inflight[0] is snapshot:
+                return self._inflight[1], False
+            future = Future()
+            # A render of an older snapshot keeps running for its own waiters, but is no longer the one to join
+            self._inflight = (snapshot, future)
+            return future, True
+
+    def produce(self, snapshot: FoodProviderSnapshot, future: Future):
+        """Render every format into a claimed future. Blocking, call it from a worker thread."""
+        try:
+            directory = self._render_directory(snapshot.generation)
+            rows = [FoodProviderResponse.model_validate(p, from_attributes=True) for p in snapshot.get_all()]
+            artifacts = {
+                "ndjson": ExportArtifact(snapshot.generation, "ndjson", _render_ndjson(rows), directory),
+                "csv": ExportArtifact(snapshot.generation, "csv", _render_csv(rows), directory),
+            }
+        except BaseException as e:
+            self.abandon(snapshot, future, e)
+            raise
+        with self._lock:
+            self._current = (snapshot, artifacts)
+            self._release(snapshot)
+            self._rendered = [d for d in self._rendered if d != directory] + [directory]
+            expired, self._rendered = self._rendered[:-2], self._rendered[-2:]
+        for old in expired:
+            shutil.rmtree(old, ignore_errors=True)
+        future.set_result(artifacts)
+        logger.info(f"Rendered exports for generation {snapshot.generation} ({len(rows)} providers)")
+
+    def abandon(self, snapshot: FoodProviderSnapshot, future: Future, error: BaseException):
+        """Fail a claimed render, so its waiters get the error and the next request claims a fresh one."""
+        with self._lock:
+            self._release(snapshot)
+        future.set_exception(error)
+
+    def _release(self, snapshot: FoodProviderSnapshot):
+        if self._inflight is not None and self._inflight[0] is snapshot:
+            self._inflight = None
+
+    def render(self, snapshot: FoodProviderSnapshot) -> Dict[str, ExportArtifact]:
+        """Render every format for the given snapshot unless already done. Blocking, call it from a worker thread."""
+        future, owner = self.claim(snapshot)
+        if owner:
+            self.produce(snapshot, future)
+        return future.result()
+
+
+dataset_exporter = DatasetExporter()
+
+
+def negotiate_encoding(accept_encoding: str, available: Collection[str]) -> Optional[str]:
+    """Pick the preferred available coding acceptable to the client, or None when nothing is acceptable."""
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        qualities[name] = q
+
+    def quality(encoding: str) -> float:
+        if encoding in qualities:
+            return qualities[encoding]
+        if "*" in qualities:
+            return qualities["*"]
+        # identity is acceptable unless explicitly refused
+        return 1.0 if encoding == "identity" else 0.0
+
+    candidates = [e for e in ENCODINGS if e in available and quality(e) > 0]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda e: (quality(e), -ENCODINGS.index(e)))
+
+
+def parse_range(header: str, length: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range into inclusive (start, end) offsets. Returns None when the header should be ignored
+    (multiple ranges or another unit) and raises ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, length - suffix), length - 1
+    start = int(first)
+    end = length - 1 if last == "" else min(int(last), length - 1)
+    if start >= length or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+async def _read_chunks(file: BinaryIO, start: int, length: int):
+    try:
+        file.seek(start)
+        while length > 0:
+            # File reads are blocking, keep them off the event loop
+            chunk = await asyncio.to_thread(file.read, min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+async def _await_render(snapshot: FoodProviderSnapshot) -> Dict[str, ExportArtifact]:
+    future, owner = dataset_exporter.claim(snapshot)
+    if owner:
+        try:
+            # Shielded: cancelling a queued job would leave the claim open and its waiters waiting forever
+            await asyncio.shield(query_executor.run(lambda: dataset_exporter.produce(snapshot, future), math.inf))
+        except ExecutorSaturated as e:
+            dataset_exporter.abandon(snapshot, future, e)
+    # Shield so that one disconnecting client does not cancel the render for everyone else
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+
+@router.get(
+    "/export/{fmt}",
+    summary="Export the complete data set",
+    description="Download every food provider in the current data set as NDJSON or CSV. The export is rendered once "
+                "per data set update and served pre-compressed based on Accept-Encoding (gzip, and zstd when "
+                "available). Supports ETag / If-None-Match and single HTTP byte ranges.",
+    response_description="The complete data set",
+    tags=["food-providers"],
+    responses={
+        200: {"content": {"application/x-ndjson": {}, "text/csv": {}}},
+        206: {"description": "Partial content"},
+        304: {"description": "Not modified"},
+        404: {"description": "Unknown export format"},
+        406: {"description": "No acceptable content encoding"},
+        416: {"description": "Range not satisfiable"},
+        503: {"description": "Server is busy"},
+    },
+)
+async def export_providers(request: Request, repository: Annotated[FoodProviderRepository, Depends(get_repository)],
+                           fmt: str):
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail=f"'{fmt}' is not a supported export format")
+
+    snapshot = repository.snapshot()
+    # Serving a rendered export is a buffer send. Rendering (only when the post-ingest render has not happened yet,
+    # e.g. right after startup) is a full scan: one request runs it through the executor like any other expensive
+    # query, and every other request awaits the same render without taking a worker.
+    artifacts = dataset_exporter.lookup(snapshot)
+    if artifacts is None:
+        try:
+            artifacts = await _await_render(snapshot)
+        except ExecutorSaturated as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry later",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+    artifact = artifacts[fmt]
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), artifact.paths)
+    if encoding is None:
+        raise HTTPException(status_code=406, detail="No acceptable content encoding")
+    size = artifact.sizes[encoding]
+    etag = artifact.etags[encoding]
+
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{artifact.filename}"',
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and (if_none_match.strip() == "*" or etag in
+                                      [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header is not None and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    # Opened right away: the file stays readable even if a newer generation's render deletes it meanwhile
+    file = artifact.paths[encoding].open("rb")
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_read_chunks(file, start, end - start + 1), status_code=status_code, headers=headers,
+                             media_type=artifact.media_type)
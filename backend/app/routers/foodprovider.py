@@ -1,13 +1,19 @@
-from typing import List, Annotated
+import math
+from datetime import datetime, timezone, timedelta
+from typing import List, Annotated, Hashable, Optional
 
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import ValidationError, ConfigDict
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from pydantic import ValidationError, ConfigDict, TypeAdapter
 
-from app.dependencies import get_repository
+from app.dependencies import get_repository, query_executor
 from app.domain.foodprovider_specifications import HasPermitStatus, LikeStreetName, LikeName, \
-    ClosestToPointSpecification
+    ClosestToPointSpecification, ExpiresBetween, WithinCorridor, WithinRadius
+from app.domain.geo import decode_polyline
 from app.domain.models import PermitStatus, FoodProvider, Coordinate
-from app.domain.ports import FoodProviderRepository
+from app.domain.ports import FoodProviderRepository, FoodProviderSnapshot
+from app.domain.specification import Specification
+from app.routers.coalescing import SingleFlight
+from app.routers.execution import ExecutorSaturated
 from humps import camelize
 
 router = APIRouter(
@@ -26,6 +32,61 @@ class FoodProviderResponse(FoodProvider):
         populate_by_name=True,  # Allow instantiation by either snake_case or camelCase
     )
 
+    # Distance from the query point in km, filled in by distance-based queries from the value computed while filtering
+    distance_km: Optional[float] = None
+
+
+# Bounds on corridor queries, so a single request cannot ask for an arbitrarily large area
+MAX_ROUTE_POINTS = 1000
+# Wider buffers around a long city route put most providers within reach of many segments; at 1000 m a worst-case
+# route over 100k providers stays within a few seconds in the query executor
+MAX_CORRIDOR_BUFFER_M = 1000
+MAX_RADIUS_KM = 50
+# Upper bound on the expiring window, which also keeps the window end within the range of datetime
+MAX_EXPIRING_DAYS = 3650
+
+_response_adapter = TypeAdapter(List[FoodProviderResponse])
+
+# Identical concurrent queries against the same repository generation share one computation and serialized body
+_single_flight = SingleFlight()
+
+
+def _render(snapshot: FoodProviderSnapshot, spec: Specification[FoodProvider]) -> bytes:
+    items = snapshot.get_by_spec(spec)
+    responses = []
+    for p in items:
+        response = FoodProviderResponse.model_validate(p, from_attributes=True)
+        for field, value in spec.annotate(p).items():
+            setattr(response, field, value)
+        responses.append(response)
+    return _response_adapter.dump_json(responses, by_alias=True)
+
+
+async def _run_query(repository: FoodProviderRepository, key: Hashable,
+                     spec: Specification[FoodProvider]) -> Response:
+    """
+    Run the spec against the current snapshot and return the serialized result. The key must be a normalized form of
+    the query; concurrent requests with the same key and generation await the first request's computation.
+    Expensive queries are executed off the event loop and rejected with a 503 when the executor is saturated.
+    """
+    snapshot = repository.snapshot()
+
+    async def execute() -> bytes:
+        # Only the request that starts the computation estimates its cost, followers just await the result
+        cost = snapshot.estimate_cost(spec)
+        return await query_executor.run(lambda: _render(snapshot, spec), cost)
+
+    try:
+        body = await _single_flight.do((key, snapshot.generation), execute)
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return Response(content=body, media_type="application/json")
+
+
 @router.get(
     "/name/{name}",
     response_model=List[FoodProviderResponse],
@@ -33,7 +94,7 @@ class FoodProviderResponse(FoodProvider):
     description=("Search for food providers by name and optionally by permit status"),
     response_description="List of food providers",
     tags=["food-providers"],
-    responses={400: {"description": "Invalid name or status"}},
+    responses={400: {"description": "Invalid name or status"}, 503: {"description": "Server is busy"}},
 )
 async def get_food_providers(repository: Annotated[FoodProviderRepository, Depends(get_repository)], name: str = "",
                              status: str = ""):
@@ -52,8 +113,7 @@ async def get_food_providers(repository: Annotated[FoodProviderRepository, Depen
             )
         spec &= HasPermitStatus(permit_status)
 
-    items = repository.get_by_spec(spec)
-    return items
+    return await _run_query(repository, ("name", name.lower(), status.upper()), spec)
 
 
 @router.get(
@@ -63,7 +123,7 @@ async def get_food_providers(repository: Annotated[FoodProviderRepository, Depen
     description="Search for food providers by street name. Street is required",
     response_description="List of food providers",
     tags=["food-providers"],
-    responses={400: {"description": "Invalid street"}},
+    responses={400: {"description": "Invalid street"}, 503: {"description": "Server is busy"}},
 )
 async def get_food_providers(repository: Annotated[FoodProviderRepository, Depends(get_repository)], street: str):
     if street == "" or street is None:
@@ -72,8 +132,7 @@ async def get_food_providers(repository: Annotated[FoodProviderRepository, Depen
 
     print(street)
 
-    items = repository.get_by_spec(spec)
-    return items
+    return await _run_query(repository, ("street", street.lower()), spec)
 
 
 @router.get(
@@ -82,20 +141,44 @@ async def get_food_providers(repository: Annotated[FoodProviderRepository, Depen
     summary="Search for food providers closest to a given coordinate",
     description="Search for food providers closest to a given coordinate. Longitude and latitude are required, "
                 "additionally a limit can be specified to increase the number of results and a permit status can "
-                "be specified to filter by permit status. By default, only approved providers are returned.",
+                "be specified to filter by permit status. By default, only approved providers are returned. "
+                "When a radius (in km) is given, every provider within that radius is returned unless a limit is "
+                "also given. Each result includes its distance from the coordinate as distanceKm.",
     response_description="List of food providers",
     tags=["food-providers"],
-    responses={400: {"description": "Invalid longitude or latitude, or invalid limit / status"}},
+    responses={400: {"description": "Invalid longitude or latitude, or invalid limit / radius / status"},
+               503: {"description": "Server is busy"}},
 )
 async def get_n_closest_providers(repository: Annotated[FoodProviderRepository, Depends(get_repository)], lng: str,
-                                  lat: str, status: str = "APPROVED", limit: str = "5"):
+                                  lat: str, status: str = "APPROVED",
+                                  limit: Annotated[str, Query(description="Maximum number of results. Defaults to 5, "
+                                                              "or to no limit when a radius is given.")] = "",
+                                  radius: str = ""):
     try:
-        limit_int = int(limit)
+        limit_int = int(limit) if limit != "" else None
     except ValueError:
         raise HTTPException(
             status_code=400,
             detail='Limit must be an integer'
         )
+    if limit_int is not None and limit_int < 1:
+        raise HTTPException(
+            status_code=400,
+            detail='Limit must be at least 1'
+        )
+
+    try:
+        radius_km = float(radius) if radius != "" else None
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail='Radius must be a number'
+        )
+    if radius_km is not None and not 0 < radius_km <= MAX_RADIUS_KM:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Radius must be greater than 0 and at most {MAX_RADIUS_KM} km'
+        )
 
     try:
         coord = Coordinate(longitude=lng, latitude=lat)
@@ -111,7 +194,132 @@ async def get_n_closest_providers(repository: Annotated[FoodProviderRepository,
             detail=ValueError.args[0]
         )
 
-    spec = ClosestToPointSpecification(coord, limit_int)
+    if radius_km is None:
+        limit_int = 5 if limit_int is None else limit_int
+        spec = ClosestToPointSpecification(coord, limit_int)
+    else:
+        spec = WithinRadius(coord, radius_km, limit_int)
+
+    if status != "":
+        try:
+            permit_status = PermitStatus(status.upper())
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"'{status}' is not a valid PermitStatus"
+            )
+        spec &= HasPermitStatus(permit_status)
+
+    key = ("closest", coord.latitude, coord.longitude, limit_int, radius_km, status.upper())
+    return await _run_query(repository, key, spec)
+
+
+@router.get(
+    "/expiring",
+    response_model=List[FoodProviderResponse],
+    summary="Search for food providers whose permit expires soon",
+    description="Search for food providers whose permit expires within the next given number of days, ordered by "
+                "expiration date. Days defaults to 30, and a permit status can optionally be specified to filter by "
+                "permit status.",
+    response_description="List of food providers",
+    tags=["food-providers"],
+    responses={400: {"description": "Invalid days or status"}, 503: {"description": "Server is busy"}},
+)
+async def get_expiring_providers(repository: Annotated[FoodProviderRepository, Depends(get_repository)],
+                                 days: str = "30", status: str = ""):
+    try:
+        days_int = int(days)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail='Days must be an integer'
+        )
+    if days_int < 0:
+        raise HTTPException(
+            status_code=400,
+            detail='Days cannot be negative'
+        )
+    if days_int > MAX_EXPIRING_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Days must be at most {MAX_EXPIRING_DAYS}'
+        )
+
+    now = datetime.now(timezone.utc)
+    spec = ExpiresBetween(now, now + timedelta(days=days_int))
+
+    if status != "":
+        try:
+            permit_status = PermitStatus(status.upper())
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"'{status}' is not a valid PermitStatus"
+            )
+        spec &= HasPermitStatus(permit_status)
+
+    return await _run_query(repository, ("expiring", days_int, status.upper()), spec)
+
+
+def _parse_route(polyline: str, path: str) -> List[Coordinate]:
+    if (polyline == "") == (path == ""):
+        raise HTTPException(status_code=400, detail="Exactly one of polyline or path must be given")
+    try:
+        if polyline != "":
+            points = decode_polyline(polyline)
+        else:
+            points = []
+            for pair in path.split("|"):
+                lat, lng = pair.split(",")
+                lat, lng = float(lat), float(lng)
+                # float() accepts "nan", which every range check lets through
+                if math.isnan(lat) or math.isnan(lng):
+                    raise ValueError("Coordinate is not a number")
+                points.append((lat, lng))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Route could not be parsed")
+
+    if len(points) == 0 or len(points) > MAX_ROUTE_POINTS:
+        raise HTTPException(status_code=400, detail=f"Route must have between 1 and {MAX_ROUTE_POINTS} points")
+    try:
+        return [Coordinate(latitude=lat, longitude=lng) for lat, lng in points]
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=e.errors()[0]["msg"]
+        )
+
+
+@router.get(
+    "/corridor",
+    response_model=List[FoodProviderResponse],
+    summary="Search for food providers along a route",
+    description="Search for food providers within a buffer distance (in meters, default 300) of a route, ordered by "
+                "their position along the route. The route is given either as a Google encoded polyline or as a "
+                "path of 'lat,lng' pairs separated by '|'. By default, only approved providers are returned.",
+    response_description="List of food providers",
+    tags=["food-providers"],
+    responses={400: {"description": "Invalid route, buffer or status"}, 503: {"description": "Server is busy"}},
+)
+async def get_providers_along_route(repository: Annotated[FoodProviderRepository, Depends(get_repository)],
+                                    polyline: str = "", path: str = "", buffer: str = "300",
+                                    status: str = "APPROVED"):
+    route = _parse_route(polyline, path)
+
+    try:
+        buffer_m = float(buffer)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail='Buffer must be a number'
+        )
+    if not 0 < buffer_m <= MAX_CORRIDOR_BUFFER_M:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Buffer must be greater than 0 and at most {MAX_CORRIDOR_BUFFER_M} meters'
+        )
+
+    spec = WithinCorridor(route, buffer_m)
 
     if status != "":
         try:
@@ -123,5 +331,5 @@ async def get_n_closest_providers(repository: Annotated[FoodProviderRepository,
             )
         spec &= HasPermitStatus(permit_status)
 
-    items = repository.get_by_spec(spec)
-    return items
+    key = ("corridor", tuple((c.latitude, c.longitude) for c in route), buffer_m, status.upper())
+    return await _run_query(repository, key, spec)
@@ -0,0 +1,62 @@
+"""
+Fires N identical /closest requests concurrently and reports how many times the query was actually computed.
+With request coalescing the number of computations stays at one regardless of N, which is asserted. By default the
+repository holds as many synthetic rows as the bundled SFGov export, where nearly every query is cheap enough to run
+inline on the event loop.
+
+Usage (from the backend directory): python -m benchmarks.coalescing [rows]
+"""
+import asyncio
+import logging
+import sys
+import time
+
+import httpx
+
+from app.adapters.memory import InMemoryFoodProviderRepository, InMemoryFoodProviderSnapshot
+from app.dependencies import get_repository
+from app.main import app
+from benchmarks.fake_socrata import load_bundled_rows
+from benchmarks.synthetic import make_providers
+
+CONCURRENCY_LEVELS = (1, 10, 100, 500)
+PARAMS = {"lng": "-122.3961", "lat": "37.7879", "status": "APPROVED", "limit": "10"}
+
+
+async def main(rows: int):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(make_providers(rows))
+    async def override_repository():
+        return repository
+
+    app.dependency_overrides[get_repository] = override_repository
+
+    computations = 0
+    original_get_by_spec = InMemoryFoodProviderSnapshot.get_by_spec
+
+    def counting_get_by_spec(self, spec):
+        nonlocal computations
+        computations += 1
+        return original_get_by_spec(self, spec)
+
+    InMemoryFoodProviderSnapshot.get_by_spec = counting_get_by_spec
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'concurrent':>10} {'computations':>13} {'wall ms':>9}")
+        for n in CONCURRENCY_LEVELS:
+            computations = 0
+            started = time.perf_counter()
+            responses = await asyncio.gather(
+                *(client.get("/api/v1/food-providers/closest", params=PARAMS) for _ in range(n)))
+            elapsed = (time.perf_counter() - started) * 1000
+            assert all(r.status_code == 200 for r in responses)
+            print(f"{n:>10} {computations:>13} {elapsed:>9.1f}")
+            assert computations <= 1, f"{n} identical requests were computed {computations} times"
+
+    InMemoryFoodProviderSnapshot.get_by_spec = original_get_by_spec
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else len(load_bundled_rows())))
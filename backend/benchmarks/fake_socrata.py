@@ -0,0 +1,133 @@
+"""
+Local stand-in for the Socrata API used by SFGovFoodProviderDataClient. It serves the resource and metadata
+endpoints sodapy calls, backed either by the bundled Mobile_Food_Facility_Permit_*.csv or by synthetic rows of any
+size, with configurable per-request latency and a rowsUpdatedAt value that can be bumped on demand or on a timer.
+
+Usage as a standalone server (from the backend directory):
+    python -m benchmarks.fake_socrata --rows 50000 --latency-ms 50 --update-every 30
+and point a client at it with SFGovFoodProviderDataClient(domain="127.0.0.1:<port>", secure=False).
+"""
+import argparse
+import csv
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from app.adapters.sfgov_data_client import DATASET_ID
+from benchmarks.synthetic import make_rows
+
+RESOURCES_DIR = Path(__file__).resolve().parent.parent / "resources"
+
+
+def load_bundled_rows() -> List[dict]:
+    """Rows from the bundled CSV export, keyed like the JSON API (lower-cased column names)."""
+    path = sorted(RESOURCES_DIR.glob("Mobile_Food_Facility_Permit_*.csv"))[-1]
+    with path.open(newline="", encoding="utf-8") as f:
+        return [{k.lower(): v for k, v in row.items() if v != ""} for row in csv.DictReader(f)]
+
+
+class FakeSocrataServer:
+    def __init__(self, rows: List[dict], latency: float = 0.0, update_every: Optional[float] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.rows = rows
+        self.latency = latency
+        self.update_every = update_every
+        self.rows_updated_at = int(time.time())
+        # Called with the request offset whenever a page of rows is served, e.g. to mark ingest windows
+        self.on_page: Optional[Callable[[int], None]] = None
+        self.page_requests = 0
+        self.metadata_requests = 0
+        self._stop = threading.Event()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def domain(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"{host}:{port}"
+
+    def bump(self):
+        """Simulate an upstream data change."""
+        self.rows_updated_at = max(self.rows_updated_at + 1, int(time.time()))
+
+    def start(self) -> "FakeSocrataServer":
+        self._threads.append(threading.Thread(target=self._httpd.serve_forever, daemon=True))
+        if self.update_every:
+            self._threads.append(threading.Thread(target=self._update_loop, daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _update_loop(self):
+        while not self._stop.wait(self.update_every):
+            self.bump()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                if url.path == f"/api/views/{DATASET_ID}.json":
+                    server.metadata_requests += 1
+                    return self._send({"id": DATASET_ID, "rowsUpdatedAt": server.rows_updated_at})
+                if url.path == f"/resource/{DATASET_ID}.json":
+                    params = parse_qs(url.query)
+                    limit = int(params.get("$limit", ["1000"])[0])
+                    offset = int(params.get("$offset", ["0"])[0])
+                    server.page_requests += 1
+                    if server.on_page is not None:
+                        server.on_page(offset)
+                    return self._send(server.rows[offset:offset + limit])
+                self.send_error(404)
+
+            def _send(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=0, help="synthetic row count (default: bundled CSV)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--update-every", type=float, default=None, help="seconds between rowsUpdatedAt changes")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows) if args.rows else load_bundled_rows()
+    server = FakeSocrataServer(rows, args.latency_ms / 1000, args.update_every, port=args.port).start()
+    print(f"Serving {len(rows)} rows of {DATASET_ID} on http://{server.domain}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+End-to-end ingest-under-load harness. Starts a local fake Socrata server, runs the real DataManager and SFGov client
+against it, and drives the API in-process with a realistic mix of queries while upstream changes trigger ingests.
+Reports throughput and p50/p95/p99 latency separately for requests that overlapped an ingest and for the rest.
+
+Usage (from the backend directory):
+    python -m benchmarks.load --rows 50000 --duration 30 --concurrency 32 --ingest-every 10
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from typing import List, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from app.adapters.memory import InMemoryFoodProviderRepository
+from app.adapters.sfgov_data_client import SFGovFoodProviderDataClient
+from app.data_manager import DataManager
+from app.dependencies import get_repository
+from app.main import app
+from benchmarks.fake_socrata import FakeSocrataServer, load_bundled_rows
+from benchmarks.synthetic import make_rows
+
+API = "/api/v1/food-providers"
+
+
+class HarnessClient(SFGovFoodProviderDataClient):
+    def __init__(self, domain: str, poll_interval: int):
+        super().__init__(domain=domain, secure=False)
+        self._poll_interval = poll_interval
+
+    def get_interval(self) -> int:
+        return self._poll_interval
+
+
+class IngestWindows:
+    """Collects [start, end] intervals during which an ingest was in progress."""
+
+    def __init__(self):
+        self.windows: List[Tuple[float, float]] = []
+        self._started = None
+
+    def page_requested(self, offset: int):
+        if offset == 0 and self._started is None:
+            self._started = time.perf_counter()
+
+    def installed(self):
+        if self._started is not None:
+            self.windows.append((self._started, time.perf_counter()))
+            self._started = None
+
+    def overlaps(self, start: float, end: float) -> bool:
+        return any(start <= w_end and end >= w_start for w_start, w_end in self.windows)
+
+    def total(self, start: float, end: float) -> float:
+        return sum(max(0.0, min(end, w_end) - max(start, w_start)) for w_start, w_end in self.windows)
+
+
+def make_query(rng: random.Random, names: List[str], streets: List[str]) -> Tuple[str, dict]:
+    roll = rng.random()
+    if roll < 0.5:
+        # The SPA's default view: nearest providers around downtown
+        lat, lng = 37.78 + rng.gauss(0, 0.01), -122.40 + rng.gauss(0, 0.01)
+        return f"{API}/closest", {"lat": f"{lat:.5f}", "lng": f"{lng:.5f}"}
+    if roll < 0.75:
+        return f"{API}/name/{quote(rng.choice(names), safe='')}", {}
+    if roll < 0.9:
+        return f"{API}/street/{quote(rng.choice(streets), safe='')}", {}
+    if roll < 0.97:
+        return f"{API}/expiring", {"days": str(rng.choice([7, 30, 90]))}
+    return f"{API}/closest", {"lat": "37.7879", "lng": "-122.3961", "status": "", "limit": "50"}
+
+
+def percentile(values: List[float], pct: int) -> float:
+    if not values:
+        return float("nan")
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1] if len(values) > 1 else values[0]
+
+
+async def run(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    rows = make_rows(args.rows) if args.rows else load_bundled_rows()
+    windows = IngestWindows()
+
+    with FakeSocrataServer(rows, latency=args.latency_ms / 1000) as server:
+        server.on_page = windows.page_requested
+        repository = InMemoryFoodProviderRepository()
+        install = repository.install
+
+        def instrumented_install(snapshot):
+            install(snapshot)
+            windows.installed()
+
+        repository.install = instrumented_install
+        async def override_repository():
+            return repository
+
+        app.dependency_overrides[get_repository] = override_repository
+
+        data_manager = DataManager(repository, [HarnessClient(server.domain, args.poll_interval)])
+        data_manager.start()
+        while len(repository.snapshot()) == 0:
+            await asyncio.sleep(0.05)
+        windows.windows.clear()
+
+        # Names containing "/" cannot be expressed as a path parameter, skip them
+        names = sorted({r["applicant"] for r in rows if r.get("applicant") and "/" not in r["applicant"]})
+        streets = sorted({r["address"] for r in rows if r.get("address") and "/" not in r["address"]})
+        rng = random.Random(7)
+        samples: List[Tuple[float, float, int]] = []
+
+        async def bump_upstream():
+            while True:
+                await asyncio.sleep(args.ingest_every)
+                server.bump()
+
+        async def worker(client: httpx.AsyncClient, deadline: float):
+            while time.perf_counter() < deadline:
+                path, params = make_query(rng, names, streets)
+                started = time.perf_counter()
+                r = await client.get(path, params=params)
+                samples.append((started, time.perf_counter(), r.status_code))
+
+        transport = httpx.ASGITransport(app=app)
+        bumper = asyncio.create_task(bump_upstream())
+        run_started = time.perf_counter()
+        deadline = run_started + args.duration
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=60) as client:
+            await asyncio.gather(*(worker(client, deadline) for _ in range(args.concurrency)))
+        run_ended = time.perf_counter()
+        bumper.cancel()
+        await data_manager.stop()
+
+    in_ingest = [s for s in samples if windows.overlaps(s[0], s[1])]
+    outside = [s for s in samples if not windows.overlaps(s[0], s[1])]
+    ingest_time = windows.total(run_started, run_ended)
+    phases = (("during ingest", in_ingest, ingest_time), ("outside ingest", outside, args.duration - ingest_time))
+
+    print(f"rows={len(rows)} concurrency={args.concurrency} duration={args.duration}s "
+          f"ingests={len(windows.windows)} ingest_time={ingest_time:.1f}s")
+    print(f"{'phase':>15} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'non-200':>8}")
+    for phase, phase_samples, phase_time in phases:
+        latencies = [(end - start) * 1000 for start, end, _ in phase_samples]
+        errors = sum(1 for *_, status in phase_samples if status != 200)
+        throughput = len(phase_samples) / phase_time if phase_time > 0 else float("nan")
+        print(f"{phase:>15} {len(phase_samples):>9} {throughput:>8.1f} {percentile(latencies, 50):>8.1f} "
+              f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f} {errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=0, help="synthetic row count (default: bundled CSV)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake upstream latency per request")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ingest-every", type=float, default=5.0, help="seconds between upstream changes")
+    parser.add_argument("--poll-interval", type=int, default=1, help="DataManager metadata poll interval")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Reports resident bytes per provider for the Pydantic FoodProvider layout and for the compact ProviderRecord layout
+used by the in-memory repository. Rows go through JSON and the SFGov mapper so every string is a separate object,
+just like a real ingest.
+
+Usage (from the backend directory): python -m benchmarks.memory [rows]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from app.adapters.compact import ProviderRecord
+from app.adapters.sfgov_data_client import SFGovFoodProviderDataClient
+from benchmarks.synthetic import make_rows
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    retained = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del retained
+    return after - before
+
+
+def main(rows: int):
+    payload = json.dumps(make_rows(rows))
+    client = SFGovFoodProviderDataClient()
+
+    def pydantic_layout():
+        return client.map_results(json.loads(payload))
+
+    def compact_layout():
+        pool = {}
+        # Models are created one row at a time and dropped once their record exists
+        return [ProviderRecord.from_model(p, pool) for p in client.map_results(json.loads(payload))], pool
+
+    results = {"FoodProvider (Pydantic)": measure(pydantic_layout), "ProviderRecord (compact)": measure(compact_layout)}
+    print(f"{'layout':>26} {'total MiB':>10} {'bytes/provider':>15}")
+    for layout, total in results.items():
+        print(f"{layout:>26} {total / 2 ** 20:>10.1f} {total / rows:>15.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
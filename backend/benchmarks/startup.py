@@ -0,0 +1,49 @@
+"""
+Measures cold start: the time to import the application and the time to serve the first /health and first
+/openapi.json responses, with and without the startup-optimized mode (FAST_STARTUP). Each sample runs in a fresh
+interpreter so nothing is cached between runs.
+
+Usage (from the backend directory): python -m benchmarks.startup [samples]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SAMPLE_SCRIPT = """
+import json, logging, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+logging.disable(logging.CRITICAL)
+from fastapi.testclient import TestClient
+client = TestClient(app)
+ready = time.perf_counter()
+assert client.get("/health").status_code == 200
+health = time.perf_counter()
+assert client.get("/openapi.json").status_code == 200
+docs = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_health_ms": (health - ready) * 1000,
+                  "first_openapi_ms": (docs - health) * 1000}))
+"""
+
+
+def sample(fast_startup: bool) -> dict:
+    env = dict(os.environ, FAST_STARTUP="1" if fast_startup else "0")
+    out = subprocess.run([sys.executable, "-c", SAMPLE_SCRIPT], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(samples: int):
+    print(f"{'mode':>10} {'import ms':>10} {'1st /health ms':>15} {'1st /openapi.json ms':>21}")
+    for fast_startup in (False, True):
+        results = [sample(fast_startup) for _ in range(samples)]
+        median = {k: statistics.median(r[k] for r in results) for k in results[0]}
+        mode = "fast" if fast_startup else "default"
+        print(f"{mode:>10} {median['import_ms']:>10.1f} {median['first_health_ms']:>15.2f} "
+              f"{median['first_openapi_ms']:>21.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
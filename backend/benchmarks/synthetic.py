@@ -0,0 +1,75 @@
+import random
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+from app.domain.models import FoodProvider, Permit, PermitStatus, Coordinate
+
+# Rough shape of the SFGov data set: a few hundred applicants sharing many names, streets and menus
+APPLICANTS = [f"Applicant {i}" for i in range(300)]
+STREETS = [f"{n} {s} ST" for n in range(1, 400, 7) for s in ("MISSION", "MARKET", "SANSOME", "FOLSOM", "HOWARD")]
+FOOD_ITEMS = [
+    "Tacos: Burritos: Quesadillas: Soda",
+    "Hot dogs: chips: soda: water",
+    "Coffee: Pastries: Sandwiches",
+    "sunflower seeds: crackerjacks: bottled water: peanuts: candy",
+    "Asian Fusion: Rice Bowls: Noodles",
+]
+STATUSES = [PermitStatus.APPROVED] * 6 + [PermitStatus.EXPIRED] * 3 + [PermitStatus.REQUESTED, PermitStatus.SUSPEND]
+
+
+def make_rows(count: int, seed: int = 42) -> List[dict]:
+    """Raw Socrata-style rows, as returned by the SFGov API."""
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        approved = base + timedelta(days=rng.randint(0, 365))
+        block = f"{rng.randint(1000, 9999)}"
+        lot = f"{rng.randint(1, 99):03d}"
+        rows.append({
+            "objectid": str(1_000_000 + i),
+            "locationid": str(1_000_000 + i),
+            "applicant": rng.choice(APPLICANTS),
+            "facilitytype": rng.choice(["Truck", "Push Cart"]),
+            "cnn": str(rng.randint(100000, 9999999)),
+            "locationdescription": f"{rng.choice(STREETS)}: {rng.choice(STREETS)} to {rng.choice(STREETS)}",
+            "address": rng.choice(STREETS),
+            "blocklot": block + lot,
+            "block": block,
+            "lot": lot,
+            "permit": f"{rng.randint(18, 25)}MFF-{rng.randint(1, 200):05d}",
+            "status": rng.choice(STATUSES).value,
+            "fooditems": rng.choice(FOOD_ITEMS),
+            "latitude": str(37.70 + rng.random() * 0.12),
+            "longitude": str(-122.52 + rng.random() * 0.16),
+            "approved": approved.isoformat(),
+            "received": (approved - timedelta(days=30)).strftime("%Y%m%d"),
+            "expirationdate": (approved + timedelta(days=365)).isoformat(),
+        })
+    return rows
+
+
+def make_providers(count: int, seed: int = 42) -> List[FoodProvider]:
+    """Domain providers built from make_rows without going through a data client."""
+    providers = []
+    for row in make_rows(count, seed):
+        providers.append(FoodProvider(
+            location_id=row["locationid"],
+            name=row["applicant"],
+            food_items=row["fooditems"],
+            permit=Permit(
+                permitStatus=PermitStatus(row["status"]),
+                permitID=row["permit"],
+                approvalDate=datetime.fromisoformat(row["approved"]).replace(tzinfo=timezone.utc),
+                recievedDate=datetime.strptime(row["received"], "%Y%m%d").replace(tzinfo=timezone.utc),
+                expirationDate=datetime.fromisoformat(row["expirationdate"]).replace(tzinfo=timezone.utc),
+            ),
+            coord=Coordinate(latitude=row["latitude"], longitude=row["longitude"]),
+            location_description=row["locationdescription"],
+            blocklot=row["blocklot"],
+            block=row["block"],
+            lot=row["lot"],
+            cnn=int(row["cnn"]),
+            address=row["address"],
+        ))
+    return providers
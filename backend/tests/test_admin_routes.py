@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import admin
+
+client = TestClient(app)
+
+
+def test_refresh_requires_configured_token(monkeypatch):
+    refreshes = []
+    monkeypatch.setattr(admin.data_manager, "refresh", lambda: refreshes.append(True))
+
+    monkeypatch.delenv(admin.REFRESH_TOKEN_ENV, raising=False)
+    assert client.post("/api/v1/admin/refresh", headers={"Authorization": "Bearer anything"}).status_code == 404
+
+    monkeypatch.setenv(admin.REFRESH_TOKEN_ENV, "s3cret")
+    assert client.post("/api/v1/admin/refresh").status_code == 401
+    assert client.post("/api/v1/admin/refresh", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.post("/api/v1/admin/refresh", headers={"Authorization": "Basic s3cret"}).status_code == 401
+    assert refreshes == []
+
+    r = client.post("/api/v1/admin/refresh", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 202
+    assert refreshes == [True]
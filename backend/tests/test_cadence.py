@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+
+from app.domain.cadence import UpdateCadence
+
+START = datetime(2026, 1, 5, 6, 0, tzinfo=timezone.utc)
+
+
+def _daily_cadence():
+    cadence = UpdateCadence()
+    # Daily updates, with one of them observed twice and one arriving late
+    for day, minutes in ((0, 0), (1, 0), (1, 0), (2, 10), (3, 0), (4, 0)):
+        cadence.observe(START + timedelta(days=day, minutes=minutes))
+    return cadence
+
+
+def test_default_interval_until_cadence_is_known():
+    cadence = UpdateCadence()
+    assert cadence.next_interval(START) == cadence.default_interval == cadence.max_interval
+    cadence.observe(START)
+    assert cadence.cadence is None
+    assert cadence.next_interval(START) == cadence.default_interval
+
+
+def test_learns_median_cadence():
+    assert _daily_cadence().cadence == timedelta(days=1).total_seconds()
+
+
+def test_polls_rarely_between_updates_and_often_around_expected_update():
+    cadence = _daily_cadence()
+    last_update = START + timedelta(days=4)
+
+    # Shortly after an update the next one is far away, so wait until the polling window (2.4 h either side of the
+    # expected update) opens
+    assert cadence.max_interval == timedelta(hours=21, minutes=36).total_seconds()
+    assert cadence.next_interval(last_update + timedelta(minutes=5)) == timedelta(hours=21, minutes=31).total_seconds()
+    assert cadence.next_interval(last_update + timedelta(hours=21)) == timedelta(minutes=36).total_seconds()
+    # Around the expected update, spread eight checks over the window
+    assert cadence.next_interval(last_update + timedelta(hours=23)) == timedelta(minutes=36).total_seconds()
+    assert cadence.next_interval(last_update + timedelta(hours=25)) == timedelta(minutes=36).total_seconds()
+
+
+def test_skipped_update_backs_off_until_the_next_expected_one():
+    cadence = _daily_cadence()
+    last_update = START + timedelta(days=4)
+
+    # The expected update's window has passed without an update, so the following day's window is awaited
+    assert cadence.next_interval(last_update + timedelta(hours=30)) == timedelta(hours=15, minutes=36).total_seconds()
+    assert cadence.next_interval(last_update + timedelta(hours=47, minutes=50)) == timedelta(minutes=36).total_seconds()
+
+
+def _simulate(cadence, last_update, next_update):
+    """Poll from shortly after last_update until next_update is noticed; return the number of checks and when."""
+    now = last_update + timedelta(minutes=5)
+    checks, noticed = 0, None
+    while noticed is None:
+        checks += 1
+        if now >= next_update:
+            cadence.observe(next_update)
+            noticed = now
+        now += timedelta(seconds=cadence.next_interval(now))
+    return checks, noticed
+
+
+def test_daily_cadence_checks_far_less_often_than_hourly():
+    cadence = _daily_cadence()
+    next_update = START + timedelta(days=5)
+    checks, noticed = _simulate(cadence, START + timedelta(days=4), next_update)
+    # Instead of 24 hourly checks, and the update is noticed sooner than hourly polling would on average
+    assert checks <= 10
+    assert noticed - next_update < timedelta(minutes=36)
+
+
+def test_weekly_cadence_checks_far_less_often_than_hourly():
+    cadence = UpdateCadence()
+    for week in range(4):
+        cadence.observe(START + timedelta(weeks=week))
+    next_update = START + timedelta(weeks=4)
+    checks, noticed = _simulate(cadence, START + timedelta(weeks=3), next_update)
+    # Inside the 34 h window checks are at most an hour apart, as with fixed polling; none are made before it opens
+    assert checks <= 20
+    assert noticed - next_update <= timedelta(hours=1)
+
+
+def test_off_schedule_update_waits_for_the_next_window():
+    cadence = _daily_cadence()
+    last_update = START + timedelta(days=4)
+    # Arrives mid-way between two expected updates, far outside the window. Updates like this one are what the
+    # refresh endpoint is for.
+    checks, noticed = _simulate(cadence, last_update, last_update + timedelta(hours=12))
+    assert checks == 2
+    assert noticed == last_update + timedelta(hours=21, minutes=36)
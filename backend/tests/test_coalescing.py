@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.adapters.memory import InMemoryFoodProviderRepository, InMemoryFoodProviderSnapshot
+from app import dependencies
+from app.dependencies import get_repository
+from app.main import app
+from app.routers import foodprovider
+from app.routers.coalescing import SingleFlight
+from tests.helpers import general_mock_providers
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_computation():
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    results = await asyncio.gather(*(flight.do("key", compute) for _ in range(20)))
+
+    assert results == [1] * 20
+    assert calls == 1
+    assert len(flight) == 0
+
+    # Nothing is cached after the computation finished
+    assert await flight.do("key", compute) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_to_all_waiters():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("key", fail) for _ in range(5)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency", [1, 10, 50])
+async def test_identical_concurrent_requests_are_computed_once(monkeypatch, concurrency):
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(general_mock_providers())
+    monkeypatch.setitem(app.dependency_overrides, get_repository, lambda: repository)
+
+    computations = 0
+    original_get_by_spec = InMemoryFoodProviderSnapshot.get_by_spec
+
+    def slow_get_by_spec(self, spec):
+        nonlocal computations
+        computations += 1
+        # Make the query slow enough that every request arrives while it is still running
+        time.sleep(0.2)
+        return original_get_by_spec(self, spec)
+
+    monkeypatch.setattr(InMemoryFoodProviderSnapshot, "get_by_spec", slow_get_by_spec)
+    # Treat every query as expensive so it runs off the loop and concurrent requests overlap
+    monkeypatch.setattr(foodprovider.query_executor, "cost_threshold", 0)
+
+    params = {"lng": "-122.39610066847152", "lat": "37.78798864899528", "status": "EXPIRED"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            *(client.get("/api/v1/food-providers/closest", params=params) for _ in range(concurrency)))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.content for r in responses}) == 1
+    assert len(responses[0].json()) == 3
+    assert computations == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_inline_requests_are_computed_once(monkeypatch):
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(general_mock_providers())
+    # The real dependency, not an override: a sync dependency would be resolved in a thread pool, which lets requests
+    # reach the query one pool slot at a time instead of together
+    monkeypatch.setattr(dependencies, "repository", repository)
+    monkeypatch.delitem(app.dependency_overrides, get_repository, raising=False)
+
+    computations = 0
+    original_get_by_spec = InMemoryFoodProviderSnapshot.get_by_spec
+
+    def counting_get_by_spec(self, spec):
+        nonlocal computations
+        computations += 1
+        return original_get_by_spec(self, spec)
+
+    monkeypatch.setattr(InMemoryFoodProviderSnapshot, "get_by_spec", counting_get_by_spec)
+    # A cheap query on a small data set runs inline on the loop and finishes within a single step
+    assert foodprovider.query_executor.cost_threshold > 0
+
+    params = {"lng": "-122.39610066847152", "lat": "37.78798864899528", "status": "EXPIRED"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            *(client.get("/api/v1/food-providers/closest", params=params) for _ in range(100)))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.content for r in responses}) == 1
+    assert computations == 1
@@ -1,12 +1,15 @@
 import asyncio
+import threading
 from datetime import datetime, timezone
 from typing import List
 
 import pytest
 
 from app.adapters.memory import InMemoryFoodProviderRepository
+from app.adapters import sfgov_data_client
 from app.adapters.sfgov_data_client import SFGovFoodProviderDataClient
-from app.data_manager import DataManager
+from app.data_manager import DataManager, PREFETCH_PAGES
+from benchmarks.fake_socrata import FakeSocrataServer, load_bundled_rows
 from tests import helpers  # type: ignore
 
 
@@ -19,6 +22,9 @@ class TestClient(SFGovFoodProviderDataClient):
         # We don't rely on raw rows in this test since we override map_results.
         return []
 
+    async def stream_pages(self):
+        yield await self.fetch_all()
+
     def map_results(self, results: List[dict]):
         # Return a small, deterministic set of domain objects
         return helpers.general_mock_providers()
@@ -51,3 +57,198 @@ async def test_data_manager_loads():
     providers = repo.get_all()
     assert providers, "DataManager should populate the repository with providers"
     assert len(providers) == 5
+
+
+class CountingClient(TestClient):
+    def __init__(self):
+        super().__init__()
+        self.ingests = 0
+
+    def map_results(self, results: List[dict]):
+        self.ingests += 1
+        return super().map_results(results)
+
+    def get_interval(self) -> int:
+        # Never poll on a timer, only the initial load and refreshes fetch
+        return 3600
+
+
+@pytest.mark.asyncio
+async def test_refresh_bursts_are_debounced_into_one_fetch():
+    repo = InMemoryFoodProviderRepository()
+    client = CountingClient()
+    dm = DataManager(repo, [client], refresh_debounce=0.1)
+    dm.start()
+    for _ in range(40):
+        if client.ingests:
+            break
+        await asyncio.sleep(0.05)
+    assert client.ingests == 1
+
+    # Metadata is unchanged, but a refresh always fetches
+    for _ in range(5):
+        dm.refresh()
+        await asyncio.sleep(0.01)
+    for _ in range(40):
+        if client.ingests > 1:
+            break
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.2)
+    await dm.stop()
+
+    assert client.ingests == 2
+
+
+class FakeSocrataClient(SFGovFoodProviderDataClient):
+    def get_interval(self) -> int:
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_data_manager_ingests_from_fake_socrata():
+    repo = InMemoryFoodProviderRepository()
+
+    with FakeSocrataServer(load_bundled_rows()) as server:
+        dm = DataManager(repo, [FakeSocrataClient(domain=server.domain, secure=False)])
+        dm.start()
+        for _ in range(100):
+            if repo.get_all():
+                break
+            await asyncio.sleep(0.05)
+        first_generation = repo.snapshot().generation
+
+        # An upstream change is picked up on the next poll
+        server.bump()
+        for _ in range(60):
+            if repo.snapshot().generation > first_generation:
+                break
+            await asyncio.sleep(0.05)
+        await dm.stop()
+
+    assert len(repo.get_all()) > 400
+    assert repo.snapshot().generation > first_generation
+
+
+class PagedClient(SFGovFoodProviderDataClient):
+    def __init__(self, pages: int, fail_on_page: int | None = None, fail_mapping_on_page: int | None = None):
+        self.pages = pages
+        self.fail_on_page = fail_on_page
+        self.fail_mapping_on_page = fail_mapping_on_page
+        self.closed = False
+        self.fetched = 0
+        self.mapped = 0
+        self.max_ahead = 0
+
+    async def fetch_all(self) -> List[dict]:
+        return [row async for page in self.stream_pages() for row in page]
+
+    async def stream_pages(self):
+        try:
+            for page in range(self.pages):
+                if page == self.fail_on_page:
+                    raise RuntimeError("upstream went away")
+                self.fetched += 1
+                self.max_ahead = max(self.max_ahead, self.fetched - self.mapped)
+                yield [{"page": page, "index": i} for i in range(3)]
+        finally:
+            self.closed = True
+
+    def map_results(self, results: List[dict]):
+        if self.mapped == self.fail_mapping_on_page:
+            raise ValueError("unmappable page")
+        self.mapped += 1
+        return [helpers.make_provider(f"{r['page']}-{r['index']}") for r in results]
+
+
+@pytest.mark.asyncio
+async def test_ingest_streams_pages_into_a_single_generation():
+    repo = InMemoryFoodProviderRepository()
+    client = PagedClient(pages=10)
+    dm = DataManager(repo, [client])
+
+    count = await dm._ingest(client)
+
+    assert count == 30
+    assert len(repo.get_all()) == 30
+    assert repo.snapshot().generation == 1
+    # Backpressure: ahead of the page about to be mapped, the fetcher holds at most the queued pages plus one page
+    # blocked on a full queue, however many pages there are
+    assert client.max_ahead <= PREFETCH_PAGES + 2
+
+
+@pytest.mark.asyncio
+async def test_failed_ingest_keeps_previous_generation():
+    repo = InMemoryFoodProviderRepository()
+    repo.replace_all(helpers.general_mock_providers())
+    client = PagedClient(pages=10, fail_on_page=4)
+    dm = DataManager(repo, [client])
+
+    with pytest.raises(RuntimeError):
+        await dm._ingest(client)
+
+    assert [p.location_id for p in repo.get_all()] == ["A", "B", "C", "D", "E"]
+
+
+@pytest.mark.asyncio
+async def test_failed_mapping_closes_the_page_stream():
+    repo = InMemoryFoodProviderRepository()
+    client = PagedClient(pages=10, fail_mapping_on_page=2)
+    dm = DataManager(repo, [client])
+
+    with pytest.raises(ValueError):
+        await dm._ingest(client)
+
+    # The source is closed before the failure propagates, not left to the garbage collector
+    assert client.closed
+    assert client.fetched < client.pages
+
+
+@pytest.mark.asyncio
+async def test_listeners_receive_each_published_snapshot():
+    repo = InMemoryFoodProviderRepository()
+    client = PagedClient(pages=2)
+    dm = DataManager(repo, [client])
+    published = []
+
+    def failing_listener(snapshot):
+        raise ValueError("listener failures do not fail the ingest")
+
+    dm.add_listener(failing_listener)
+    dm.add_listener(published.append)
+
+    await dm._ingest(client)
+    await asyncio.gather(*dm._listener_tasks)
+
+    assert published == [repo.snapshot()]
+    assert len(published[0]) == 6
+
+
+@pytest.mark.asyncio
+async def test_slow_listeners_do_not_hold_up_the_ingest():
+    repo = InMemoryFoodProviderRepository()
+    client = PagedClient(pages=2)
+    dm = DataManager(repo, [client])
+    release = threading.Event()
+    dm.add_listener(lambda snapshot: release.wait(5))
+
+    # Returns while the listener is still running
+    assert await asyncio.wait_for(dm._ingest(client), 1) == 6
+    assert len(dm._listener_tasks) == 1
+
+    release.set()
+    await asyncio.gather(*dm._listener_tasks)
+    assert not dm._listener_tasks
+
+
+@pytest.mark.asyncio
+async def test_sfgov_client_streams_pages(monkeypatch):
+    monkeypatch.setattr(sfgov_data_client, "PAGE_SIZE", 100)
+    rows = load_bundled_rows()
+
+    with FakeSocrataServer(rows) as server:
+        client = SFGovFoodProviderDataClient(domain=server.domain, secure=False)
+        pages = [page async for page in client.stream_pages()]
+        fetched = await client.fetch_all()
+
+    assert [len(p) for p in pages] == [100, 100, 100, 100, len(rows) - 400]
+    assert fetched == rows
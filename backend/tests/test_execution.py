@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.adapters.memory import InMemoryFoodProviderRepository
+from app.dependencies import get_repository
+from app.domain.foodprovider_specifications import LikeName, HasPermitStatus, ClosestToPointSpecification, \
+    WithinCorridor, WithinRadius
+from app.domain.indexes import GeoIndex, SortedIndex
+from app.domain.models import PermitStatus, Coordinate
+from app.main import app
+from app.routers import foodprovider
+from app.routers.execution import QueryExecutor, ExecutorSaturated
+from tests.helpers import general_mock_providers
+
+
+@pytest.mark.asyncio
+async def test_cheap_queries_run_inline_and_expensive_ones_in_pool():
+    executor = QueryExecutor(max_workers=1, max_queue=0, cost_threshold=100)
+
+    assert await executor.run(threading.get_ident, cost=10) == threading.get_ident()
+    assert await executor.run(threading.get_ident, cost=1000) != threading.get_ident()
+    assert executor.admitted == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_expensive_queries_are_rejected_when_saturated():
+    executor = QueryExecutor(max_workers=1, max_queue=1, cost_threshold=100)
+    release = threading.Event()
+
+    running = [asyncio.ensure_future(executor.run(release.wait, cost=1000)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+    assert executor.admitted == 2
+
+    with pytest.raises(ExecutorSaturated):
+        await executor.run(release.wait, cost=1000)
+    # Cheap queries are still served inline
+    assert await executor.run(lambda: "cheap", cost=1) == "cheap"
+
+    release.set()
+    await asyncio.gather(*running)
+    assert executor.admitted == 0
+    executor.shutdown()
+
+
+def test_saturated_executor_returns_503_and_health_stays_up(monkeypatch):
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(general_mock_providers())
+    monkeypatch.setitem(app.dependency_overrides, get_repository, lambda: repository)
+    monkeypatch.setattr(foodprovider.query_executor, "cost_threshold", 0)
+    monkeypatch.setattr(foodprovider.query_executor, "_admitted", 10_000)
+
+    client = TestClient(app)
+    r = client.get("/api/v1/food-providers/name/Truly")
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+    assert client.get("/health").status_code == 200
+
+
+def test_cost_estimate_grows_with_candidates_and_results():
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(general_mock_providers())
+    snapshot = repository.snapshot()
+
+    narrow = snapshot.estimate_cost(HasPermitStatus(PermitStatus.SUSPEND))
+    broad = snapshot.estimate_cost(LikeName("") | HasPermitStatus(PermitStatus.EXPIRED))
+    assert 0 < narrow < broad
+
+
+def test_cost_estimate_uses_index_bounds_not_candidate_sets(monkeypatch):
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(general_mock_providers())
+    snapshot = repository.snapshot()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("estimate_cost must not build candidate sets")
+
+    monkeypatch.setattr(GeoIndex, "bbox", fail)
+    monkeypatch.setattr(SortedIndex, "range", fail)
+
+    point = Coordinate(latitude=1.0, longitude=2.0)
+    route = [Coordinate(latitude=1.0, longitude=2.0), Coordinate(latitude=50.0, longitude=50.0)]
+    assert snapshot.estimate_cost(WithinRadius(point, 1.0) & HasPermitStatus(PermitStatus.APPROVED)) > 0
+    assert snapshot.estimate_cost(WithinCorridor(route, 300) | WithinRadius(point, 1.0)) > 0
+
+
+def test_cost_estimate_caps_results_at_limit():
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(general_mock_providers())
+    snapshot = repository.snapshot()
+    point = Coordinate(latitude=1.0, longitude=2.0)
+
+    unlimited = snapshot.estimate_cost(ClosestToPointSpecification(point, limit=100))
+    limited = snapshot.estimate_cost(ClosestToPointSpecification(point, limit=1))
+    assert limited < unlimited
+
+    # The limit applies through composition, since the limited specification orders the results
+    approved = HasPermitStatus(PermitStatus.APPROVED)
+    assert (approved & ClosestToPointSpecification(point, limit=1)).result_limit() == 1
+    assert (approved & ~WithinRadius(point, 1.0, limit=3)).result_limit() == 3
+    assert (approved & LikeName("truly")).result_limit() is None
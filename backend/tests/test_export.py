@@ -0,0 +1,175 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import threading
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.adapters.memory import InMemoryFoodProviderRepository
+from app.dependencies import get_repository, query_executor
+from app.main import app
+from app.routers import export
+from app.routers.export import dataset_exporter, negotiate_encoding, parse_range
+from tests.helpers import general_mock_providers
+
+EXPORT = "/api/v1/food-providers/export"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(general_mock_providers())
+    monkeypatch.setitem(app.dependency_overrides, get_repository, lambda: repository)
+    return TestClient(app)
+
+
+def test_export_ndjson_and_csv(client):
+    r = client.get(f"{EXPORT}/ndjson", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert "content-encoding" not in r.headers
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [p["locationId"] for p in lines] == ["A", "B", "C", "D", "E"]
+    assert lines[0]["permit"]["permitStatus"] == "APPROVED"
+    assert "distanceKm" not in lines[0]
+
+    r = client.get(f"{EXPORT}/csv", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["locationId"] for row in rows] == ["A", "B", "C", "D", "E"]
+    assert rows[2]["permitStatus"] == "EXPIRED"
+    assert rows[0]["latitude"] == "1.0"
+
+    assert client.get(f"{EXPORT}/xml").status_code == 404
+
+
+def test_export_is_served_precompressed_and_rendered_once_per_generation(client, monkeypatch):
+    renders = 0
+    original = dataset_exporter.produce.__func__
+
+    def counting_produce(self, snapshot, future):
+        nonlocal renders
+        renders += 1
+        return original(self, snapshot, future)
+
+    monkeypatch.setattr(type(dataset_exporter), "produce", counting_produce)
+
+    identity = client.get(f"{EXPORT}/ndjson", headers={"Accept-Encoding": "identity"}).content
+    # Stream the raw bytes so the client does not transparently decode them
+    with client.stream("GET", f"{EXPORT}/ndjson", headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        assert r.headers["vary"] == "Accept-Encoding"
+        compressed = b"".join(r.iter_raw())
+    assert gzip.decompress(compressed) == identity
+    assert len(compressed) < len(identity)
+    assert renders == 1
+
+
+@pytest.mark.asyncio
+async def test_export_requests_await_the_render_in_flight(monkeypatch):
+    repository = InMemoryFoodProviderRepository()
+    repository.replace_all(general_mock_providers())
+    monkeypatch.setitem(app.dependency_overrides, get_repository, lambda: repository)
+    snapshot = repository.snapshot()
+
+    started = threading.Event()
+    release = threading.Event()
+    original = export._render_ndjson
+
+    def slow_render(rows):
+        started.set()
+        release.wait(5)
+        return original(rows)
+
+    monkeypatch.setattr(export, "_render_ndjson", slow_render)
+    # The post-ingest render, as the data manager runs it
+    listener = asyncio.ensure_future(asyncio.to_thread(dataset_exporter.render, snapshot))
+    await asyncio.to_thread(started.wait, 5)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        requests = [asyncio.ensure_future(http.get(f"{EXPORT}/csv")) for _ in range(8)]
+        await asyncio.sleep(0.1)
+        # Every request waits on the listener's render without holding a query worker
+        assert query_executor.admitted == 0
+        assert not any(r.done() for r in requests)
+        release.set()
+        responses = await asyncio.gather(*requests)
+    await listener
+
+    assert [r.status_code for r in responses] == [200] * 8
+    assert len({r.content for r in responses}) == 1
+
+
+def test_export_files_are_kept_for_the_current_and_previous_generation():
+    repository = InMemoryFoodProviderRepository()
+    exporter = export.DatasetExporter()
+    directories = []
+    try:
+        for _ in range(3):
+            repository.replace_all(general_mock_providers())
+            artifacts = exporter.render(repository.snapshot())
+            paths = artifacts["csv"].paths
+            directories.append(paths["identity"].parent)
+            assert paths["identity"].read_bytes().startswith(b"locationId,")
+            assert gzip.decompress(paths["gzip"].read_bytes()) == paths["identity"].read_bytes()
+            assert artifacts["csv"].sizes["gzip"] == paths["gzip"].stat().st_size
+
+        # A response of the previous generation may still be streaming, the one before is gone
+        assert [d.exists() for d in directories] == [False, True, True]
+    finally:
+        exporter.close()
+    assert not any(d.exists() for d in directories)
+
+
+def test_export_etag_and_ranges(client):
+    headers = {"Accept-Encoding": "identity"}
+    full = client.get(f"{EXPORT}/csv", headers=headers)
+    etag = full.headers["etag"]
+
+    r = client.get(f"{EXPORT}/csv", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    r = client.get(f"{EXPORT}/csv", headers={**headers, "Range": "bytes=10-19"})
+    assert r.status_code == 206
+    assert r.content == full.content[10:20]
+    assert r.headers["content-range"] == f"bytes 10-19/{len(full.content)}"
+
+    r = client.get(f"{EXPORT}/csv", headers={**headers, "Range": "bytes=-5"})
+    assert r.content == full.content[-5:]
+
+    r = client.get(f"{EXPORT}/csv", headers={**headers, "Range": f"bytes={len(full.content)}-"})
+    assert r.status_code == 416
+    assert r.headers["content-range"] == f"bytes */{len(full.content)}"
+
+    # A stale If-Range validator means the client gets the whole current representation
+    r = client.get(f"{EXPORT}/csv", headers={**headers, "Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert r.status_code == 200
+    assert r.content == full.content
+
+
+def test_negotiate_encoding():
+    available = {"identity": b"", "gzip": b"", "zstd": b""}
+    assert negotiate_encoding("", available) == "identity"
+    assert negotiate_encoding("gzip, deflate, br", available) == "gzip"
+    assert negotiate_encoding("gzip, zstd", available) == "zstd"
+    assert negotiate_encoding("gzip;q=1.0, zstd;q=0.5", available) == "gzip"
+    assert negotiate_encoding("zstd", {"identity": b"", "gzip": b""}) == "identity"
+    assert negotiate_encoding("identity;q=0", {"identity": b""}) is None
+    assert negotiate_encoding("*;q=0, gzip", available) == "gzip"
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 50) == (0, 49)
+    assert parse_range("bytes=-100", 50) == (0, 49)
+    assert parse_range("bytes=0-1, 4-5", 50) is None
+    assert parse_range("items=0-1", 50) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=60-", 50)
+    with pytest.raises(ValueError):
+        parse_range("bytes=9-3", 50)
@@ -4,7 +4,8 @@ from fastapi.testclient import TestClient
 from app.adapters.memory import InMemoryFoodProviderRepository
 from app.dependencies import get_repository
 from app.main import app
-from tests.helpers import general_mock_providers
+from app.domain.models import PermitStatus
+from tests.helpers import general_mock_providers, make_provider, make_permit
 
 mock_repository = InMemoryFoodProviderRepository()
 
@@ -15,7 +16,7 @@ def setup_reposiotry_data():
     mock_repository.replace_all(mock_providers)
 
 
-def override_repository():
+async def override_repository():
     return mock_repository
 
 
@@ -79,3 +80,85 @@ def test_closest_endpoint_limit_with_status_and_limit():
     data = first.json()
     assert isinstance(data, list)
     assert len(data) == 2
+
+
+def test_expiring_endpoint():
+    mock_repository.replace_all([
+        make_provider("A", permit=make_permit(PermitStatus.APPROVED, exp_delta_days=20)),
+        make_provider("B", permit=make_permit(PermitStatus.EXPIRED, exp_delta_days=3)),
+        make_provider("C", permit=make_permit(PermitStatus.APPROVED, exp_delta_days=90)),
+    ])
+
+    r = client.get("/api/v1/food-providers/expiring", params={"days": "30"})
+    assert r.status_code == 200
+    assert [d["locationId"] for d in r.json()] == ["B", "A"]
+
+    r = client.get("/api/v1/food-providers/expiring", params={"days": "30", "status": "approved"})
+    assert r.status_code == 200
+    assert [d["locationId"] for d in r.json()] == ["A"]
+
+    assert client.get("/api/v1/food-providers/expiring", params={"days": "soon"}).status_code == 400
+    assert client.get("/api/v1/food-providers/expiring", params={"days": "10000000"}).status_code == 400
+
+
+def test_corridor_endpoint():
+    mock_repository.replace_all([
+        make_provider("far", latitude=37.7812, longitude=-122.4115),
+        make_provider("near", latitude=37.7954, longitude=-122.3940),
+        make_provider("expired", latitude=37.7901, longitude=-122.4006, permit=make_permit(PermitStatus.EXPIRED)),
+        make_provider("off-route", latitude=37.8000, longitude=-122.4100),
+    ])
+    path = "37.7955,-122.3937|37.7899,-122.4010|37.7810,-122.4117"
+
+    r = client.get("/api/v1/food-providers/corridor", params={"path": path})
+    assert r.status_code == 200
+    assert [d["locationId"] for d in r.json()] == ["near", "far"]
+
+    r = client.get("/api/v1/food-providers/corridor", params={"path": path, "status": "", "buffer": "100"})
+    assert [d["locationId"] for d in r.json()] == ["near", "expired", "far"]
+
+    # The same route as an encoded polyline
+    r = client.get("/api/v1/food-providers/corridor", params={"polyline": "{|teFr_`jV~a@rl@rv@zaA", "status": ""})
+    assert r.status_code == 200
+    assert [d["locationId"] for d in r.json()] == ["near", "expired", "far"]
+
+    for params in ({}, {"path": path, "polyline": "{|teFr_`jV"}, {"path": "37.79"}, {"polyline": "!!"},
+                   {"path": path, "buffer": "0"}, {"path": path, "buffer": "1001"}, {"path": path, "buffer": "wide"},
+                   {"path": "95,-122.39"}, {"path": "37.78,-122.4|abc,def"}, {"path": "nan,nan"}):
+        assert client.get("/api/v1/food-providers/corridor", params=params).status_code == 400
+
+
+def test_closest_endpoint_radius():
+    mock_repository.replace_all([
+        make_provider("far", latitude=37.8014, longitude=-122.3961),
+        make_provider("near", latitude=37.7879, longitude=-122.3904),
+        make_provider("expired", latitude=37.7870, longitude=-122.3961, permit=make_permit(PermitStatus.EXPIRED)),
+    ])
+    params = {"lat": "37.7879", "lng": "-122.3961"}
+
+    r = client.get("/api/v1/food-providers/closest", params={**params, "radius": "2", "status": ""})
+    assert r.status_code == 200
+    data = r.json()
+    assert [d["locationId"] for d in data] == ["expired", "near", "far"]
+    assert [round(d["distanceKm"], 1) for d in data] == [0.1, 0.5, 1.5]
+
+    r = client.get("/api/v1/food-providers/closest", params={**params, "radius": "1"})
+    assert [d["locationId"] for d in r.json()] == ["near"]
+
+    r = client.get("/api/v1/food-providers/closest", params={**params, "radius": "2", "limit": "1", "status": ""})
+    assert [d["locationId"] for d in r.json()] == ["expired"]
+
+    # Distances are included without a radius too
+    r = client.get("/api/v1/food-providers/closest", params=params)
+    assert [round(d["distanceKm"], 1) for d in r.json()] == [0.5, 1.5]
+
+    for radius in ("0", "-1", "100", "wide"):
+        assert client.get("/api/v1/food-providers/closest", params={**params, "radius": radius}).status_code == 400
+
+
+def test_closest_endpoint_rejects_limits_below_one():
+    params = {"lng": "-122.39610066847152", "lat": "37.78798864899528"}
+    for limit in ("0", "-1", "few"):
+        assert client.get("/api/v1/food-providers/closest", params={**params, "limit": limit}).status_code == 400
+        r = client.get("/api/v1/food-providers/closest", params={**params, "limit": limit, "radius": "2"})
+        assert r.status_code == 400
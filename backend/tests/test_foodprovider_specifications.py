@@ -1,8 +1,19 @@
+import math
+import random
+
+import pytest
+
 from app.adapters.memory import InMemoryFoodProviderRepository
 from app.domain.foodprovider_specifications import HasPermitStatus, LikeName, LikeStreetName, \
-    ClosestToPointSpecification
-from app.domain.models import PermitStatus, Coordinate
-from tests.helpers import make_provider, make_permit
+    ClosestToPointSpecification, ExpiresBetween, ApprovedSince, PermitDateInRange, WithinCorridor, \
+    WithinRadius
+from datetime import datetime, timezone, timedelta
+
+from app.domain.geo import KM_PER_DEGREE
+from app.domain.models import PermitStatus, Coordinate, haversine_distance
+from app.domain.specification import AllOfSpecification, AnyOfSpecification
+from app.domain.statistics import FoodProviderStatistics
+from tests.helpers import make_provider, make_permit, general_mock_providers
 
 
 class TestSpecifications:
@@ -63,3 +74,243 @@ class TestSpecifications:
         assert res[0].location_id == "A"
         assert res[1].location_id == "B"
         assert res[2].location_id == "C"
+
+
+class TestSpecificationOptimization:
+    def test_and_chain_is_flattened_and_most_selective_runs_first(self):
+        stats = FoodProviderStatistics.from_providers(general_mock_providers())
+        closest = ClosestToPointSpecification(Coordinate(latitude=0.1, longitude=0.1))
+        approved = HasPermitStatus(PermitStatus.APPROVED)
+        street = LikeStreetName("Mission")
+
+        plan = ((closest & approved) & street).optimize(stats)
+
+        assert isinstance(plan, AllOfSpecification)
+        assert plan.specs[0] is approved
+        assert plan.specs[-1] is closest
+        assert len(plan.specs) == 3
+
+    def test_or_chain_prefers_most_likely_match(self):
+        stats = FoodProviderStatistics.from_providers(general_mock_providers())
+        approved = HasPermitStatus(PermitStatus.APPROVED)
+        expired = HasPermitStatus(PermitStatus.EXPIRED)
+
+        plan = (approved | expired).optimize(stats)
+
+        assert isinstance(plan, AnyOfSpecification)
+        assert plan.specs == [expired, approved]
+
+    def test_optimized_results_match_unoptimized(self):
+        providers = general_mock_providers()
+        repo = InMemoryFoodProviderRepository()
+        repo.replace_all(providers)
+
+        specs = [
+            ClosestToPointSpecification(Coordinate(latitude=0.1, longitude=0.1), limit=3) & HasPermitStatus(
+                PermitStatus.EXPIRED),
+            LikeName("truly") & ~HasPermitStatus(PermitStatus.EXPIRED),
+            (LikeStreetName("test") | HasPermitStatus(PermitStatus.APPROVED)) & LikeName("e"),
+        ]
+        for spec in specs:
+            expected = spec.order(spec.filter(providers))
+            assert [p.location_id for p in repo.get_by_spec(spec)] == [p.location_id for p in expected]
+
+
+class TestPermitDateSpecifications:
+    @staticmethod
+    def _providers():
+        return [
+            make_provider("soon", permit=make_permit(PermitStatus.APPROVED, exp_delta_days=5)),
+            make_provider("later", permit=make_permit(PermitStatus.APPROVED, exp_delta_days=60)),
+            make_provider("expired", permit=make_permit(PermitStatus.EXPIRED, exp_delta_days=-10)),
+            make_provider("sooner", permit=make_permit(PermitStatus.EXPIRED, exp_delta_days=2)),
+            make_provider("none", permit=make_permit(PermitStatus.APPROVED)),
+        ]
+
+    def test_expires_between_uses_index_and_orders_by_expiration(self):
+        repo = InMemoryFoodProviderRepository()
+        repo.replace_all(self._providers())
+        now = datetime.now(timezone.utc)
+
+        spec = ExpiresBetween(now, now + timedelta(days=30))
+
+        assert spec.candidates(repo.snapshot().get_indexes()) == {0, 3}
+        assert [p.location_id for p in repo.get_by_spec(spec)] == ["sooner", "soon"]
+
+    def test_permit_date_in_range_is_abstract(self):
+        with pytest.raises(TypeError):
+            PermitDateInRange(None, None)
+
+    def test_date_specifications_compose(self):
+        repo = InMemoryFoodProviderRepository()
+        providers = self._providers()
+        repo.replace_all(providers)
+        now = datetime.now(timezone.utc)
+        soon = ExpiresBetween(now, now + timedelta(days=30))
+
+        specs = [
+            soon & HasPermitStatus(PermitStatus.APPROVED),
+            ~soon,
+            soon | ExpiresBetween(None, now),
+            ApprovedSince(now - timedelta(days=1)) & ~HasPermitStatus(PermitStatus.EXPIRED),
+        ]
+        for spec in specs:
+            expected = spec.order(spec.filter(providers))
+            assert [p.location_id for p in repo.get_by_spec(spec)] == [p.location_id for p in expected]
+
+        assert [p.location_id for p in repo.get_by_spec(specs[0])] == ["soon"]
+        assert [p.location_id for p in repo.get_by_spec(specs[2])] == ["expired", "sooner", "soon"]
+
+
+class TestCorridorSpecification:
+    # Along Market Street, from the Ferry Building towards Civic Center
+    ROUTE = [Coordinate(latitude=37.7955, longitude=-122.3937), Coordinate(latitude=37.7899, longitude=-122.4010),
+             Coordinate(latitude=37.7810, longitude=-122.4117)]
+
+    @staticmethod
+    def _providers():
+        return [
+            make_provider("end", latitude=37.7812, longitude=-122.4115),
+            make_provider("middle", latitude=37.7901, longitude=-122.4006),
+            # Roughly 1 km north of the route
+            make_provider("off-route", latitude=37.8000, longitude=-122.4100),
+            make_provider("start", latitude=37.7954, longitude=-122.3940, permit=make_permit(PermitStatus.EXPIRED)),
+            make_provider("elsewhere", latitude=40.0, longitude=-120.0),
+        ]
+
+    def test_matches_within_buffer_ordered_along_route(self):
+        spec = WithinCorridor(self.ROUTE, 300)
+        providers = self._providers()
+
+        assert [p.location_id for p in spec.order(spec.filter(providers))] == ["start", "middle", "end"]
+        assert spec.position_along_route(providers[1]) == pytest.approx(0.9, abs=0.1)
+        assert WithinCorridor(self.ROUTE, 1).filter(providers) == []
+
+    def test_single_point_route_is_a_radius(self):
+        spec = WithinCorridor(self.ROUTE[:1], 100)
+        assert [p.location_id for p in spec.filter(self._providers())] == ["start"]
+
+    def test_corridor_uses_location_index_and_composes(self):
+        repo = InMemoryFoodProviderRepository()
+        providers = self._providers()
+        repo.replace_all(providers)
+
+        assert WithinCorridor(self.ROUTE, 300).candidates(repo.snapshot().get_indexes()) == {0, 1, 3}
+
+        specs = [
+            WithinCorridor(self.ROUTE, 300) & HasPermitStatus(PermitStatus.APPROVED),
+            ~WithinCorridor(self.ROUTE, 300),
+            WithinCorridor(self.ROUTE, 300) | HasPermitStatus(PermitStatus.APPROVED),
+        ]
+        for spec in specs:
+            expected = spec.order(spec.filter(providers))
+            assert [p.location_id for p in repo.get_by_spec(spec)] == [p.location_id for p in expected]
+
+        assert [p.location_id for p in repo.get_by_spec(specs[0])] == ["middle", "end"]
+
+    def test_corridor_matches_every_segment(self):
+        # A winding route with short and long legs, checked against each of its segments on its own
+        rng = random.Random(7)
+        route = [Coordinate(latitude=37.70 + 0.1 * abs(math.sin(i / 7)), longitude=-122.50 + 0.002 * i)
+                 for i in range(60)] + [Coordinate(latitude=37.30, longitude=-121.90)]
+        providers = [make_provider(str(i), latitude=rng.uniform(37.25, 37.85), longitude=rng.uniform(-122.55, -121.85))
+                     for i in range(600)]
+        repo = InMemoryFoodProviderRepository()
+        repo.replace_all(providers)
+
+        for buffer_m in (50, 1000):
+            spec = WithinCorridor(route, buffer_m)
+            expected = set()
+            for a, b in zip(route, route[1:]):
+                expected.update(p.location_id for p in WithinCorridor([a, b], buffer_m).filter(providers))
+            assert {p.location_id for p in spec.filter(providers)} == expected
+            assert {p.location_id for p in repo.get_by_spec(spec)} == expected
+
+    def test_route_spanning_many_latitudes_agrees_with_index(self):
+        # A long leg far north must not distort the scale of the short leg in San Francisco
+        route = [Coordinate(latitude=60, longitude=-140), Coordinate(latitude=37, longitude=-140),
+                 Coordinate(latitude=37, longitude=-122), Coordinate(latitude=37.01, longitude=-122)]
+        km_per_degree_east = KM_PER_DEGREE * math.cos(math.radians(37))
+        providers = [
+            # 5.5 km east of the last leg, outside a 5 km buffer
+            make_provider("outside", latitude=37.005, longitude=-122 + 5.5 / km_per_degree_east),
+            make_provider("inside", latitude=37.005, longitude=-122 + 4.5 / km_per_degree_east),
+        ]
+        repo = InMemoryFoodProviderRepository()
+        repo.replace_all(providers)
+        spec = WithinCorridor(route, 5000)
+
+        assert [p.location_id for p in spec.filter(providers)] == ["inside"]
+        assert {providers[i].location_id for i in spec.candidates(repo.snapshot().get_indexes())} >= {"inside"}
+        assert [p.location_id for p in repo.get_by_spec(spec)] == ["inside"]
+
+    def test_route_with_a_far_north_vertex_matches_every_segment(self):
+        # A dense route through San Francisco with a single leg up to the pole
+        route = [Coordinate(latitude=37.71 + 0.09 * i / 199, longitude=-122.50 + 0.12 * i / 199) for i in range(200)]
+        mixed = route + [Coordinate(latitude=89.9, longitude=-122.37)]
+        rng = random.Random(11)
+        providers = [make_provider(str(i), latitude=rng.uniform(37.70, 37.81), longitude=rng.uniform(-122.52, -122.36))
+                     for i in range(400)]
+        repo = InMemoryFoodProviderRepository()
+        repo.replace_all(providers)
+
+        spec = WithinCorridor(mixed, 1000)
+
+        expected = set()
+        for a, b in zip(mixed, mixed[1:]):
+            expected.update(p.location_id for p in WithinCorridor([a, b], 1000).filter(providers))
+        assert {p.location_id for p in spec.filter(providers)} == expected
+        assert {p.location_id for p in repo.get_by_spec(spec)} == expected
+
+
+class TestRadiusSpecification:
+    CENTER = Coordinate(latitude=37.7879, longitude=-122.3961)
+
+    @staticmethod
+    def _providers():
+        return [
+            make_provider("1.5km", latitude=37.8014, longitude=-122.3961),
+            make_provider("0.5km", latitude=37.7879, longitude=-122.3904),
+            make_provider("expired", latitude=37.7870, longitude=-122.3961, permit=make_permit(PermitStatus.EXPIRED)),
+            # Inside the bounding box of a 1 km radius, but not within 1 km
+            make_provider("corner", latitude=37.7950, longitude=-122.3870),
+            make_provider("far", latitude=37.70, longitude=-122.50),
+        ]
+
+    def test_matches_within_radius_nearest_first_with_distance(self):
+        spec = WithinRadius(self.CENTER, 1.0)
+        providers = self._providers()
+
+        matches = spec.order(spec.filter(providers))
+
+        assert [p.location_id for p in matches] == ["expired", "0.5km"]
+        assert spec.annotate(matches[1])["distance_km"] == pytest.approx(
+            haversine_distance(37.7879, -122.3961, 37.7879, -122.3904))
+        assert [p.location_id for p in WithinRadius(self.CENTER, 2.0, limit=3).order(
+            WithinRadius(self.CENTER, 2.0).filter(providers))] == ["expired", "0.5km", "corner"]
+
+    def test_radius_uses_location_index_and_composes(self):
+        repo = InMemoryFoodProviderRepository()
+        providers = self._providers()
+        repo.replace_all(providers)
+
+        assert WithinRadius(self.CENTER, 1.0).candidates(repo.snapshot().get_indexes()) == {1, 2, 3}
+
+        specs = [
+            WithinRadius(self.CENTER, 2.0) & HasPermitStatus(PermitStatus.APPROVED),
+            ~WithinRadius(self.CENTER, 1.0),
+            WithinRadius(self.CENTER, 1.0) | LikeName("test"),
+            HasPermitStatus(PermitStatus.APPROVED) & ~WithinRadius(self.CENTER, 1.0),
+        ]
+        for spec in specs:
+            expected = spec.order(spec.filter(providers))
+            assert [p.location_id for p in repo.get_by_spec(spec)] == [p.location_id for p in expected]
+
+        assert [p.location_id for p in repo.get_by_spec(specs[0])] == ["0.5km", "corner", "1.5km"]
+
+    def test_distance_annotation_passes_through_composites(self):
+        provider = self._providers()[1]
+        spec = HasPermitStatus(PermitStatus.APPROVED) & ~WithinRadius(self.CENTER, 0.1)
+
+        assert spec.annotate(provider)["distance_km"] == pytest.approx(0.5, abs=0.01)
+        assert HasPermitStatus(PermitStatus.APPROVED).annotate(provider) == {}
@@ -0,0 +1,43 @@
+import pytest
+
+from app.domain.geo import EquirectangularProjection, bounding_box, decode_polyline, point_segment_distance
+from app.domain.indexes import FoodProviderIndexes
+from app.domain.models import haversine_distance
+from tests.helpers import general_mock_providers
+
+
+def test_decode_polyline():
+    # Reference example from the encoded polyline format documentation
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert decode_polyline("") == []
+    with pytest.raises(ValueError):
+        decode_polyline("_p~iF~ps|")
+    with pytest.raises(ValueError):
+        decode_polyline("_p~iF ps|U")
+
+
+def test_projected_distances_match_haversine_at_city_scale():
+    projection = EquirectangularProjection(37.78)
+    ax, ay = projection.project(37.7955, -122.3937)
+    bx, by = projection.project(37.7810, -122.4117)
+    px, py = projection.project(37.7901, -122.4006)
+
+    distance, t = point_segment_distance(px, py, ax, ay, ax, ay)
+    assert distance == pytest.approx(haversine_distance(37.7955, -122.3937, 37.7901, -122.4006), rel=1e-3)
+    assert t == 0.0
+
+    _, t = point_segment_distance(px, py, ax, ay, bx, by)
+    assert 0.0 < t < 1.0
+
+
+def test_bounding_box_contains_radius():
+    min_lat, max_lat, min_lon, max_lon = bounding_box(37.78, -122.41, 1.0)
+    assert haversine_distance(37.78, -122.41, max_lat, -122.41) == pytest.approx(1.0, rel=1e-2)
+    assert haversine_distance(37.78, -122.41, 37.78, min_lon) >= 1.0
+
+
+def test_location_index_bbox():
+    index = FoodProviderIndexes.build(general_mock_providers()).location
+    assert len(index) == 5
+    assert sorted(index.bbox(-70.0, 60.0, -75.0, 10.0)) == [0, 2, 3]
+    assert index.bbox(0.0, 0.5, -180.0, 180.0) == []
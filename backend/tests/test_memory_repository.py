@@ -0,0 +1,109 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+
+from app.adapters.memory import InMemoryFoodProviderRepository
+from app.domain.foodprovider_specifications import LikeName
+from app.domain.models import PermitStatus
+from tests.helpers import general_mock_providers, make_provider, make_permit
+
+REBUILD_ROWS = 100_000
+# How much worse than the baseline the worst query may get while a rebuild runs
+REBUILD_STALL_FACTOR = 5
+
+
+def test_snapshot_is_stable_across_replace_all():
+    repo = InMemoryFoodProviderRepository()
+    repo.replace_all(general_mock_providers())
+
+    snapshot = repo.snapshot()
+    repo.replace_all([make_provider("Z", name="Truly New")])
+
+    # A reader holding the old generation keeps seeing it in full
+    assert len(snapshot.get_all()) == 5
+    assert [p.location_id for p in snapshot.get_by_spec(LikeName("Truly"))] == ["A", "B"]
+
+    current = repo.snapshot()
+    assert current.generation > snapshot.generation
+    assert [p.location_id for p in current.get_all()] == ["Z"]
+
+
+def _spin(seconds: float):
+    # Pure Python work that holds the GIL like a rebuild does, but allocates nothing
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def _query_latencies(repo: InMemoryFoodProviderRepository, work: asyncio.Task) -> List[float]:
+    """Latencies of queries served on the event loop until the background work is done."""
+    latencies = []
+    while not work.done():
+        started = time.perf_counter()
+        repo.snapshot().get_by_spec(LikeName("Truly"))
+        await asyncio.sleep(0)
+        latencies.append(time.perf_counter() - started)
+    await work
+    return latencies
+
+
+@pytest.mark.asyncio
+async def test_queries_do_not_stall_during_large_rebuild():
+    repo = InMemoryFoodProviderRepository()
+    repo.replace_all(general_mock_providers())
+    initial_generation = repo.snapshot().generation
+
+    # Baseline: the same queries while a worker thread competes for the GIL. Its stalls are the thread switch
+    # interval, the least any off-loop work costs readers on this machine.
+    baseline = await _query_latencies(repo, asyncio.create_task(asyncio.to_thread(_spin, 0.5)))
+
+    permit = make_permit()
+    # Rows are produced lazily, like a streaming ingest, so the rebuild only keeps compact records alive
+    rows = (make_provider(str(i), name=f"Truck {i}", permit=permit) for i in range(REBUILD_ROWS))
+
+    rebuild_started = time.perf_counter()
+    rebuild = asyncio.create_task(asyncio.to_thread(repo.replace_all, rows))
+    stale = []
+    latencies = []
+    while not rebuild.done():
+        started = time.perf_counter()
+        snapshot = repo.snapshot()
+        result = snapshot.get_by_spec(LikeName("Truly"))
+        await asyncio.sleep(0)
+        latencies.append(time.perf_counter() - started)
+        if snapshot.generation == initial_generation:
+            stale.append(len(result))
+    await rebuild
+    rebuild_duration = time.perf_counter() - rebuild_started
+
+    assert len(repo.snapshot()) == REBUILD_ROWS
+    assert latencies, "Queries should have been served while the rebuild was running"
+    assert set(stale) <= {2}
+    # Without the off-loop rebuild the worst query would wait for the entire rebuild
+    assert max(latencies) < rebuild_duration / 2
+    # Garbage collections during the rebuild would stall readers for far longer than a few thread switches
+    assert max(latencies) < REBUILD_STALL_FACTOR * max(baseline)
+
+
+def test_compact_records_round_trip_to_models():
+    naive = make_provider("N", permit=make_permit())
+    naive.permit.approvalDate = datetime(2024, 11, 12)
+    naive.permit.recievedDate = datetime(2024, 11, 12)
+    naive.permit.expirationDate = datetime(2025, 11, 15)
+    aware = make_provider("A", permit=make_permit(PermitStatus.EXPIRED, exp_delta_days=-3))
+    # A naive ISO date next to an aware epoch fallback, as the SFGov mapping can produce for one row
+    mixed = make_provider("M", permit=make_permit())
+    mixed.permit.approvalDate = datetime(2024, 11, 12)
+    mixed.permit.recievedDate = None
+    mixed.permit.expirationDate = datetime(2025, 11, 15, tzinfo=timezone.utc)
+
+    repo = InMemoryFoodProviderRepository()
+    repo.replace_all([naive, aware, mixed])
+
+    assert repo.get_all() == [naive, aware, mixed]
+    restored = repo.get_all()[2].permit
+    assert restored.approvalDate.tzinfo is None
+    assert restored.expirationDate.tzinfo is timezone.utc
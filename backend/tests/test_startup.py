@@ -0,0 +1,58 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+from app.main import app, prebuilt_openapi, route_signature, _schema_matches_routes, PREBUILT_OPENAPI_PATH, \
+    ROUTE_SIGNATURE_KEY
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_checked_in_openapi_is_current():
+    # The startup-optimized mode serves this file, so it must be regenerated (python -m app.main) whenever routes change
+    schema = json.loads(PREBUILT_OPENAPI_PATH.read_text())
+    assert _schema_matches_routes(schema)
+    del schema[ROUTE_SIGNATURE_KEY]
+    assert schema == FastAPI.openapi(app)
+
+
+def test_route_signature_changes_with_route_details(monkeypatch):
+    # Changes that keep the app version and the set of paths, which used to go unnoticed
+    signature = route_signature()
+    route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path.endswith("/closest"))
+    monkeypatch.setattr(route, "responses", {**route.responses, 429: {"description": "Too many requests"}})
+    assert route_signature() != signature
+    monkeypatch.undo()
+
+    param = next(p for p in route.dependant.query_params if p.name == "limit")
+    monkeypatch.setattr(param.field_info, "description", "Changed")
+    assert route_signature() != signature
+    monkeypatch.undo()
+
+    assert route_signature() == signature
+
+
+def test_prebuilt_openapi_is_served_without_generation(monkeypatch):
+    def generate(self):
+        raise AssertionError("The schema should not be generated when the prebuilt one matches")
+
+    monkeypatch.setattr(app, "openapi_schema", None)
+    monkeypatch.setattr(FastAPI, "openapi", generate)
+
+    schema = prebuilt_openapi()
+
+    assert schema["info"]["title"] == app.title
+    assert ROUTE_SIGNATURE_KEY not in schema
+    assert app.openapi_schema is schema
+
+
+def test_socrata_client_is_imported_lazily():
+    out = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print('sodapy' in sys.modules)"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.strip() == "False"
@@ -13,6 +13,7 @@ export interface FoodProviderDTO {
   coord: CoordinateDto | null
   locationDescription?: string | null;
   address?: string | null;
+  distanceKm?: number | null;
 }
 
 export interface CoordinateDto {